@@ -3,16 +3,77 @@ from tools import web_search_tool,PDFGenerator
 from dotenv import load_dotenv
 load_dotenv()
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.language_models.chat_models import generate_from_stream
+from langchain_core.load import dumps
+from langchain_core.outputs import ChatResult
+import hashlib
 import os
+from functools import lru_cache
 from langchain.tools import Tool
 import traceback
+from callbacks import llm_callbacks, mark_generations
+from langchain.globals import set_llm_cache
+from llm_cache import TieredLLMCache
+from singleflight import SingleFlight
+from cassette import wrap_llm
+from metrics import DOCUMENTATION_SECONDS, timed
+
+
+# Appels LLM identiques en cours partagés entre pipelines concurrents
+llm_flight = SingleFlight()
+
+
+class StreamingChatGoogleGenerativeAI(ChatGoogleGenerativeAI):
+    """
+    Gemini en mode streaming : chaque token est transmis aux callbacks dès son arrivée.
+    Un prompt identique déjà en cours d'envoi n'est pas renvoyé au fournisseur :
+    l'appelant attend la réponse du premier appel.
+    """
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        key = hashlib.sha256(
+            (self._get_llm_string(stop=stop, **kwargs) + dumps(messages)).encode('utf-8')
+        ).hexdigest()
+        led = []
+
+        def generate():
+            led.append(True)
+            return self._generate_once(messages, stop, run_manager, **kwargs)
+
+        result = llm_flight.do(key, generate)
+        if led:
+            return result
+        # Réponse d'un autre appel : marquée pour ne compter ni appel ni tokens une deuxième fois
+        return ChatResult(generations=mark_generations(result.generations, 'shared'),
+                          llm_output=result.llm_output)
+
+    def _generate_once(self, messages, stop=None, run_manager=None, **kwargs):
+        if run_manager is None:
+            return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        return generate_from_stream(
+            self._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+        )
 
 
 ## call the gemini models
-llm=ChatGoogleGenerativeAI(model="gemini-1.5-flash",
-                           verbose=True,
-                           temperature=0.5,
-                           google_api_key="")
+def make_llm(temperature=0.5):
+    llm=StreamingChatGoogleGenerativeAI(model="gemini-1.5-flash",
+                               verbose=True,
+                               temperature=temperature,
+                               google_api_key="",
+                               callbacks=llm_callbacks)
+
+    # Enregistrement / rejeu hors ligne des réponses (LLM_MODE=record|replay)
+    return wrap_llm(llm, callbacks=llm_callbacks)
+
+
+llm = make_llm()
+
+# Cache des réponses LLM partagé par tous les agents (désactivable avec LLM_CACHE=0)
+llm_cache = None
+if os.getenv('LLM_CACHE', '1') != '0':
+    llm_cache = TieredLLMCache()
+    set_llm_cache(llm_cache)
 
 
 
@@ -109,6 +170,22 @@ code_generator_agent = Agent(
     llm=llm
 )
 
+
+@lru_cache(maxsize=None)
+def code_generator_agent_for(temperature):
+    """
+    Générateur de code identique à `code_generator_agent` mais avec sa propre température
+    (candidats générés en parallèle).
+    """
+    return Agent(
+        role=code_generator_agent.role,
+        goal=code_generator_agent.goal,
+        backstory=code_generator_agent.backstory,
+        tools=[],
+        verbose=True,
+        llm=make_llm(temperature)
+    )
+
 test_validation_agent = Agent(
     role='Test Validator Agent',
     goal="Validate the correctness, efficiency, and maintainability of the generated code using appropriate testing frameworks for the specified programming language.",
@@ -166,6 +243,18 @@ pdf_tool = Tool(
 
 class DocumentationAgent(Agent):
     def generate_documentation(self, generated_code, subject, language):
+        with timed(DOCUMENTATION_SECONDS, 'documentation'):
+            return self._generate_documentation(generated_code, subject, language)
+
+    def draft_documentation(self, generated_code, subject, language):
+        """
+        Texte de la documentation (appel LLM) sans créer le PDF : aucun effet de bord,
+        le résultat peut être abandonné sans risque.
+        """
+        with timed(DOCUMENTATION_SECONDS, 'documentation'):
+            return self._generate_documentation(generated_code, subject, language, draft=True)
+
+    def _generate_documentation(self, generated_code, subject, language, draft=False):
         if not generated_code:
             return "No code provided for documentation."
 
@@ -285,31 +374,9 @@ class DocumentationAgent(Agent):
                     formatted_doc.append(line.strip())
 
             documentation = "\n".join(formatted_doc)
-            
-            try:
-                print("\n📄 Documentation générée, création du PDF...")
-                if not documentation or not subject:
-                    raise ValueError("Documentation ou sujet manquant")
-                    
-                tool_args = f"{documentation}|||{subject}"
-                print(f"Tentative de création du PDF pour le projet: {subject}")
-                pdf_path = self.tools[0].run(tool_args)
-                
-                if pdf_path and os.path.exists(pdf_path):
-                    print(f"✅ PDF créé avec succès à: {pdf_path}")
-                    return {
-                        "status": "success",
-                        "documentation": documentation,
-                        "pdf_path": pdf_path,
-                        "message": f"✅ Documentation générée avec succès\n📂 PDF disponible : {pdf_path}"
-                    }
-                    
-            except Exception as pdf_error:
-                print(f"❌ Erreur lors de la création du PDF : {str(pdf_error)}")
-                return {
-                    "status": "error",
-                    "error": str(pdf_error)
-                }
+            if draft:
+                return documentation
+            return self.create_pdf(documentation, subject)
 
         except Exception as e:
             error_msg = f"❌ Erreur inattendue : {str(e)}\n{traceback.format_exc()}"
@@ -319,6 +386,32 @@ class DocumentationAgent(Agent):
                 "error": error_msg
             }
 
+    def create_pdf(self, documentation, subject):
+        try:
+            print("\n📄 Documentation générée, création du PDF...")
+            if not documentation or not subject:
+                raise ValueError("Documentation ou sujet manquant")
+                
+            tool_args = f"{documentation}|||{subject}"
+            print(f"Tentative de création du PDF pour le projet: {subject}")
+            pdf_path = self.tools[0].run(tool_args)
+            
+            if pdf_path and os.path.exists(pdf_path):
+                print(f"✅ PDF créé avec succès à: {pdf_path}")
+                return {
+                    "status": "success",
+                    "documentation": documentation,
+                    "pdf_path": pdf_path,
+                    "message": f"✅ Documentation générée avec succès\n📂 PDF disponible : {pdf_path}"
+                }
+                
+        except Exception as pdf_error:
+            print(f"❌ Erreur lors de la création du PDF : {str(pdf_error)}")
+            return {
+                "status": "error",
+                "error": str(pdf_error)
+            }
+
 documentation_agent = DocumentationAgent(
     role='Documentation Agent',
     goal='Take the generated code and produce a comprehensive report explaining the role of each class and method, then convert the documentation into a PDF file.',
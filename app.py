@@ -1,23 +1,44 @@
-from flask import Flask, render_template, request, send_file, jsonify
+from flask import Flask, render_template, request, send_file, jsonify, url_for, Response, stream_with_context
 from crewai import Crew, Process
 from tasks import RequirementAnalysis, TaskPlanning, CodeGenerationTask, TestValidationTask, CodeFixTask,CodeFixTask2
 from agents import (
     requirement_analysis, task_planner_agent, 
     code_generator_agent, test_validation_agent, 
-    documentation_agent
+    documentation_agent, code_generator_agent_for
 )
+from jobs import job_store, job_pool, JobConflictError, QueueFullError, emit_event, current_job
+from metrics import (
+    registry, timed, record_job_timing, STAGE_SECONDS, STAGE_ERRORS,
+    PIPELINE_SECONDS, COMPILE_SECONDS, POOL
+)
+from tracing import span, start_span
+from pipeline import Pipeline, Stage, StageCache
+from checkpoints import checkpoint_store
+from compile_errors import error_fingerprint, error_signatures
+from fix_cache import fix_cache
+from workspace import hold_workspace, project_workspace, release_workspace
+from code_splitter import split_code
+from py_executor import python_executor
+from cpp_build import build_cpp_project, CPP_FLAGS
+from runner import run_command
+from tools import PDF_FOLDER
+from sandbox import run_limits, RUN_LIMIT_MEMORY_MB
 import os
 import traceback
 from functools import wraps, lru_cache
 import subprocess
 import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 
 import time
 import sys
 import signal
+import re
 
 
 import logging
+import json
 from contextlib import contextmanager
 
 app = Flask(__name__)
@@ -41,11 +62,56 @@ def handle_errors(f):
             }), 500
     return wrapper
 
+@contextmanager
+def pipeline_stage(results, step, agent=None, output=None, cached=False):
+    """
+    Marque le début et la fin d'une étape du pipeline.
+    Les événements sont publiés sur le flux SSE du job courant ;
+    `output` désigne la clé de results['data'] renvoyée à la fin de l'étape.
+    """
+    results['current_step'] = step
+    emit_event('stage_start', stage=step, agent=agent, cached=cached)
+    start_time = time.time()
+    try:
+        with span(f"stage.{step}", stage=step, agent=agent, cached=cached):
+            yield
+    except Exception as e:
+        STAGE_ERRORS.inc(stage=step)
+        emit_event('stage_error', stage=step, agent=agent, error=str(e),
+                   duration=time.time() - start_time)
+        raise
+    duration = time.time() - start_time
+    STAGE_SECONDS.observe(duration, stage=step)
+    record_job_timing(f"stage:{step}", duration)
+    emit_event('stage_end', stage=step, agent=agent, duration=duration, cached=cached,
+               output=results['data'].get(output) if output else None)
+
 @app.route('/')
 def index():
     print("=== ROUTE / APPELEE ===")
     return render_template('index.html')
 
+def enqueue_job(topic, language, job_id=None):
+    """
+    Crée un job et le confie au pool.
+    Renvoie (job, None), (None, réponse 409) si le job repris ne peut pas l'être,
+    ou (None, réponse 429) si la file est pleine (un job repris garde alors son état d'origine).
+    """
+    try:
+        job = job_store.create(topic, language, job_id, start=lambda job: job_pool.submit(job, run_pipeline))
+    except JobConflictError as e:
+        return None, (jsonify({'error': str(e)}), 409)
+    except QueueFullError as e:
+        response = jsonify({
+            'status': 'error',
+            'error': str(e),
+            'retry_after': e.retry_after
+        })
+        response.headers['Retry-After'] = str(e.retry_after)
+        return None, (response, 429)
+    return job, None
+
+
 @app.route('/generate', methods=['POST'])
 @handle_errors
 def generate():
@@ -57,151 +123,644 @@ def generate():
     if not topic:
         return jsonify({'error': 'Topic is required'}), 400
 
-    results = {
-        'status': 'processing',
-        'current_step': 'requirements',
-        'data': {}
-    }
+    # Le pipeline dure plusieurs minutes : on le met dans la file du pool
+    # et on rend tout de suite l'identifiant du job
+    job, busy = enqueue_job(topic, language)
+    if busy:
+        return busy
+
+    return jsonify({
+        'job_id': job.id,
+        'status': job.results['status'],
+        'status_url': url_for('job_status', job_id=job.id),
+        'result_url': url_for('job_result', job_id=job.id)
+    }), 202
+
+
+@app.route('/jobs/stats')
+@handle_errors
+def jobs_stats():
+    """
+    Occupation du pool de pipelines (jobs en attente, en cours, refusés...).
+    """
+    return jsonify(job_pool.stats())
+
+
+@app.route('/jobs/<job_id>')
+@handle_errors
+def job_status(job_id):
+    """
+    Etat courant d'un job : étape en cours et résultats partiels.
+    """
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.snapshot())
+
+
+@app.route('/jobs/<job_id>/result')
+@handle_errors
+def job_result(job_id):
+    """
+    Résultat final d'un job, au même format que l'ancienne réponse de /generate.
+    """
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job.results['status'] == 'error':
+        return jsonify({
+            'status': 'error',
+            'error': job.error,
+            'step': job.results['current_step'] or 'unknown'
+        }), 500
+    if not job.finished:
+        return jsonify({
+            'job_id': job.id,
+            'status': job.results['status'],
+            'current_step': job.results['current_step']
+        }), 202
+    return jsonify(job.results)
+
+
+@app.route('/jobs/<job_id>/resume', methods=['POST'])
+@handle_errors
+def resume_job(job_id):
+    """
+    Relance un job en erreur ou interrompu à partir de ses étapes déjà terminées.
+    """
+    if checkpoint_store is None:
+        return jsonify({'error': 'Checkpoints are disabled'}), 404
 
     try:
-        # 1. Requirements Analysis
-        crew_analysis = Crew(
-            agents=[requirement_analysis],
-            tasks=[RequirementAnalysis.req(topic,language)],
-            process=Process.sequential,
-        )
-        
-        analysis_result = crew_analysis.kickoff()
-        # analysis_result = RequirementAnalysis.format_requirements_output(analysis_result)
-        results['data']['requirements'] = analysis_result
-
-        # 2. Task Planning
-        crew_planning = Crew(
-            agents=[task_planner_agent],
-            tasks=[TaskPlanning.plan_and_decompose(topic, language, analysis_result)],
-            process=Process.sequential,
-        )
-        results['current_step'] = 'planning'
-        planning_result = crew_planning.kickoff()
-        results['data']['planning'] = planning_result
+        checkpoint = checkpoint_store.load(job_id)
+    except ValueError:
+        checkpoint = None
+    if checkpoint is None:
+        return jsonify({'error': 'No checkpoint for this job'}), 404
+
+    # Le registre vérifie l'état du job d'origine et le remplace en une seule opération
+    job, busy = enqueue_job(checkpoint['job']['topic'], checkpoint['job']['language'], job_id)
+    if busy:
+        return busy
+
+    return jsonify({
+        'job_id': job.id,
+        'status': job.results['status'],
+        'resumed_stages': list(checkpoint['stages']),
+        'status_url': url_for('job_status', job_id=job.id),
+        'result_url': url_for('job_result', job_id=job.id)
+    }), 202
+
+
+def format_sse(event):
+    """
+    Sérialise un événement de job au format Server-Sent Events.
+    """
+    payload = json.dumps(event['data'], ensure_ascii=False, default=str)
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {payload}\n\n"
+
+
+def stream_job_events(job, after=0):
+    """
+    Générateur SSE : envoie les événements du job jusqu'à sa fin.
+    """
+    while True:
+        events = job.wait_events(after)
+        if not events:
+            if job.finished:
+                return
+            # Commentaire SSE pour garder la connexion ouverte derrière les proxys
+            yield ": keep-alive\n\n"
+            continue
+        for event in events:
+            yield format_sse(event)
+        after = events[-1]['id']
+
+
+def sse_response(job, after=0):
+    return Response(
+        stream_with_context(stream_job_events(job, after)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/generate/stream', methods=['POST'])
+@handle_errors
+def generate_stream():
+    """
+    Lance un job et diffuse directement sa progression (étapes et tokens LLM).
+    """
+    topic = request.form.get('topic')
+    language = request.form.get('language', 'python')
+
+    if not topic:
+        return jsonify({'error': 'Topic is required'}), 400
+
+    job, busy = enqueue_job(topic, language)
+    if busy:
+        return busy
+    response = sse_response(job)
+    response.headers['X-Job-Id'] = job.id
+    return response
+
+
+@app.route('/jobs/<job_id>/events')
+@handle_errors
+def job_events(job_id):
+    """
+    Flux SSE d'un job existant ; reprend après `Last-Event-ID` en cas de reconnexion.
+    """
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    after = request.headers.get('Last-Event-ID') or request.args.get('after', 0)
+    try:
+        after = int(after)
+    except ValueError:
+        after = 0
+    return sse_response(job, after)
+
+
+@app.route('/metrics')
+def metrics():
+    """
+    Métriques au format texte de Prometheus.
+    """
+    for state, value in job_pool.stats().items():
+        POOL.set(value, state=state)
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+# Documentation lancée dès la compilation, en parallèle de la validation (SPECULATIVE_DOCS=1)
+SPECULATIVE_DOCS = os.getenv('SPECULATIVE_DOCS', '0') == '1'
+SPECULATIVE_DOCS_WORKERS = int(os.getenv('SPECULATIVE_DOCS_WORKERS', '2'))
+
+# Corrections automatiques d'une erreur de compilation : tentatives et temps total (secondes)
+MAX_FIX_ATTEMPTS = int(os.getenv('MAX_FIX_ATTEMPTS', '3'))
+FIX_TIME_BUDGET = float(os.getenv('FIX_TIME_BUDGET', '300'))
+
+# Délai d'exécution des programmes générés (secondes)
+RUN_TIMEOUT_SECONDS = int(os.getenv('RUN_TIMEOUT_SECONDS', '30'))
+
+# Repérage de la classe principale d'un programme Java
+JAVA_MAIN = re.compile(r'public\s+static\s+void\s+main\s*\(')
+JAVA_PACKAGE = re.compile(r'^\s*package\s+([\w.]+)\s*;', re.MULTILINE)
+
+# Nombre de candidats générés en parallèle (1 = génération unique) et leurs températures
+CODEGEN_CANDIDATES = int(os.getenv('CODEGEN_CANDIDATES', '1'))
+CODEGEN_TEMPERATURES = [float(t) for t in os.getenv('CODEGEN_TEMPERATURES', '0.2,0.5,0.8,1.0').split(',')]
+
+# Clé de results['data'] renvoyée dans l'événement de fin de chaque étape
+STAGE_OUTPUTS = {
+    'requirements': 'requirements',
+    'planning': 'planning',
+    'code_generation': 'code',
+    'compilation': 'compilation',
+    'testing': 'validation',
+    'fixedCode': 'fixedCode',
+    'documentation': 'documentation'
+}
+
+# Sorties d'étapes recopiées telles quelles dans results['data']
+DATA_KEYS = {
+    'requirements': 'requirements',
+    'planning': 'planning',
+    'code': 'code',
+    'validation': 'validation',
+    'documentation': 'documentation'
+}
+
+
+def format_compilation(language, result):
+    """
+    Résumé de la compilation / exécution renvoyé au client.
+    """
+    language = language.lower()
+    compilation = {
+        'success': result.get('status') == 'success',
+        'message': result.get('message', '')
+    }
+    if language == "python":
+        compilation['output'] = result.get('execution_output', '')
+    elif language == "cpp" or language == "c++":
+        compilation['output'] = result.get('compilation_output', '')
+    elif language == "java":
+        compilation['output'] = result.get('compilation_output', '')
+        compilation['class_files'] = [f.replace('.java', '.class') for f in result.get('files', []) if f.endswith('.java')]
+    else:
+        return None
+    if language != "python" and 'run_status' in result:
+        # `success` reste celui de la compilation ; l'exécution est rapportée à part
+        compilation['run'] = {
+            'status': result['run_status'],
+            'message': result.get('run_message', ''),
+            'output': result.get('execution_output', result.get('partial_output', ''))
+        }
+    if result.get('resources'):
+        compilation['resources'] = result['resources']
+    return compilation
+
+
+def publish_stage_output(results, language, outputs):
+    """
+    Recopie les sorties d'une étape dans results['data'].
+    """
+    data = results['data']
+    for name, value in outputs.items():
+        if name in ('compile_result', 'final_compile_result'):
+            compilation = format_compilation(language, value)
+            if compilation is not None:
+                data['compilation'] = compilation
+        elif name == 'fixed_code':
+            if value is not None:
+                data['fixedCode'] = str(value)
+        elif name in DATA_KEYS:
+            data[DATA_KEYS[name]] = value
+
+
+# 1. Requirements Analysis
+def analyse_requirements(topic, language):
+    crew_analysis = Crew(
+        agents=[requirement_analysis],
+        tasks=[RequirementAnalysis.req(topic, language)],
+        process=Process.sequential,
+    )
+    return {'requirements': crew_analysis.kickoff()}
+
+
+def llm_fingerprint(agent, task):
+    """
+    Empreinte d'une étape LLM pour le cache d'étapes : modèle, température, agent et prompt.
+    Changer l'un d'eux invalide les sorties en cache sans toucher à STAGE_CACHE_VERSION.
+    """
+    return {
+        'model': getattr(agent.llm, 'model', None),
+        'temperature': getattr(agent.llm, 'temperature', None),
+        'agent': [agent.role, agent.goal, agent.backstory],
+        'prompt': [task.description, task.expected_output]
+    }
+
+
+# 2. Task Planning
+def plan_tasks(topic, language, requirements):
+    crew_planning = Crew(
+        agents=[task_planner_agent],
+        tasks=[TaskPlanning.plan_and_decompose(topic, language, requirements)],
+        process=Process.sequential,
+    )
+    return {'planning': crew_planning.kickoff()}
+
+
+# 3. Code Generation
+def generate_code(topic, language, planning):
+    crew_generation = Crew(
+        agents=[code_generator_agent],
+        tasks=[CodeGenerationTask.code_generation(topic, language, str(planning))],
+        process=Process.sequential,
+    )
+    return {'code': str(crew_generation.kickoff())}
+
+
+def candidate_succeeded(result):
+    """
+    Un candidat gagne s'il compile et, pour C++ / Java, si son programme s'exécute sans erreur.
+    """
+    return bool(result) and result.get('status') == 'success' and result.get('run_status') in (None, 'success')
 
-        # 3. Code Generation
+
+def generate_code_candidates(topic, language, planning, project_name, candidates=None):
+    """
+    Génère plusieurs candidats en parallèle (une température chacun) et compile chacun
+    dans son propre dossier (candidates/). Le premier qui compile et s'exécute sans erreur est retenu.
+
+    Les appels LLM déjà partis ne peuvent pas être interrompus : les candidats
+    perdants finissent en arrière-plan mais ne sont plus compilés. Ceux qui
+    compilaient déjà gardent le workspace du job jusqu'à leur fin (hold_workspace).
+    """
+    candidates = candidates or CODEGEN_CANDIDATES
+    temperatures = [CODEGEN_TEMPERATURES[i % len(CODEGEN_TEMPERATURES)] for i in range(candidates)]
+    winner_found = threading.Event()
+
+    def run_candidate(index, temperature):
+        agent = code_generator_agent_for(temperature)
         crew_generation = Crew(
-            agents=[code_generator_agent],
-            tasks=[CodeGenerationTask.code_generation(topic, language, str(planning_result))],
+            agents=[agent],
+            tasks=[CodeGenerationTask.code_generation(topic, language, str(planning), agent=agent)],
             process=Process.sequential,
         )
-        results['current_step'] = 'code_generation'
-        code_generation_result = crew_generation.kickoff()
-        results['data']['code'] = str(code_generation_result)
-
-        result = save_and_execute_code(code_generation_result, language, "MonProjet")
-        if result.get("status") == "success":
-            # Vérifier si le code a été modifié (nouveau code disponible)
-            if "code" in result:
-                print("nouveau code")
-                code_generation_result = result["code"]
-            # Sinon garder le code original
-            else:
-                print("ancienne code")
-                code_generation_result = code_generation_result
-        print(result)
-        if language.lower() == "python":
-            results['data']['compilation'] = {
-                'success': result.get('status') == 'timeout',
-                'message': result.get('message', ''),
-                # 'output': result.get('partial_output', '')
-            }
-        elif language.lower() == "cpp" or language.lower() == "c++":
-            results['data']['compilation'] = {
-                'success': result.get('status') == 'success',
-                'message': result.get('message', ''),
-                'output': result.get('compilation_output', '')
-            }
-        elif language.lower() == "java":
-            results['data']['compilation'] = {
-                'success': result.get('status') == 'success',
-                'message': result.get('message', ''),
-                'output': result.get('compilation_output', ''),
-                'class_files': [f.replace('.java', '.class') for f in result.get('files', []) if f.endswith('.java')]
-            }
+        with span('candidate', index=index, temperature=temperature):
+            code = str(crew_generation.kickoff())
+            if winner_found.is_set():
+                return code, None
+            # Pas de correction automatique : un autre candidat a peut-être déjà compilé
+            result = save_and_execute_code(code, language, os.path.join('candidates', f"{project_name}_{index}"),
+                                           auto_fix=False)
+        if candidate_succeeded(result):
+            winner_found.set()
+        return code, result
 
-        print(result)
-        # 4. Test Validation
-        crew_test_validation = Crew(
-            agents=[test_validation_agent],
-            tasks=[TestValidationTask.validate_code(language, topic, code_generation_result)],
-            process=Process.sequential,
+    executor = ThreadPoolExecutor(max_workers=candidates, thread_name_prefix='candidate')
+    futures = {
+        executor.submit(contextvars.copy_context().run, run_candidate, index, temperature): index
+        for index, temperature in enumerate(temperatures)
+    }
+    finished = {}
+    try:
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                code, result = future.result()
+            except Exception as e:
+                print(f"Candidat {index} en erreur : {e}")
+                emit_event('candidate_end', index=index, status='error', error=str(e))
+                continue
+            status = result.get('status') if result else 'skipped'
+            emit_event('candidate_end', index=index, temperature=temperatures[index], status=status,
+                       run_status=result.get('run_status') if result else None)
+            finished[index] = (code, result)
+            if candidate_succeeded(result):
+                print(f"Candidat {index} retenu (température {temperatures[index]})")
+                return {'code': code, 'candidate_result': result}
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        # Les perdants encore en cours ne doivent pas voir leur dossier supprimé sous eux
+        for future in futures:
+            if not future.done():
+                hold_workspace(future)
+
+    if not finished:
+        raise RuntimeError("Aucun candidat de code n'a pu être généré")
+    # Sans gagnant : un programme interrompu par le délai d'exécution a au moins tourné,
+    # puis un programme compilé dont l'exécution échoue ; sinon le premier candidat
+    # repasse par la compilation avec correction automatique
+    for acceptable in (lambda r: 'timeout' in (r.get('status'), r.get('run_status')),
+                       lambda r: r.get('status') == 'success'):
+        for index in sorted(finished):
+            code, result = finished[index]
+            if result and acceptable(result):
+                return {'code': code, 'candidate_result': result}
+    return {'code': finished[min(finished)][0], 'candidate_result': None}
+
+
+# Taille des sorties du programme transmises à l'agent de validation
+EXECUTION_REPORT_CHARS = 4000
+
+
+def execution_report(compile_result):
+    """
+    Résumé texte de la compilation et de l'exécution pour l'agent de validation.
+    Sans durées ni mesures : le même résultat donne le même texte, ce qui garde
+    l'étape de validation dans le cache des étapes.
+    """
+    if not compile_result:
+        return None
+
+    def tail(text):
+        text = str(text or '').strip()
+        return text if len(text) <= EXECUTION_REPORT_CHARS else "...\n" + text[-EXECUTION_REPORT_CHARS:]
+
+    # C++ / Java : statut de l'exécution à part de celui de la compilation
+    status = compile_result.get("run_status", compile_result.get("status"))
+    if compile_result.get("compilation_error") is not None:
+        return f"Compilation failed:\n{tail(compile_result['compilation_error'])}"
+    if compile_result.get("execution_skipped"):
+        return f"Compiled successfully; not executed: {compile_result['execution_skipped']}"
+    if "returncode" not in compile_result:
+        # Rien n'a tourné : pas de fichier principal, ou erreur avant le lancement
+        if status == "success":
+            return "Not executed: no entry point"
+        reason = compile_result.get("run_message") or compile_result.get("message") or compile_result.get("error")
+        return f"Not executed: {tail(reason)}"
+
+    lines = [f"Run status: {status}", f"Exit code: {compile_result['returncode']}"]
+    limit = (compile_result.get("resources") or {}).get("limit_exceeded")
+    if limit:
+        lines.append(f"Resource limit exceeded: {limit}")
+    stdout = compile_result.get("execution_output", compile_result.get("partial_output"))
+    stderr = compile_result.get("execution_error") or compile_result.get("execution_stderr") or compile_result.get("partial_errors")
+    if stdout:
+        lines.append(f"Standard output:\n{tail(stdout)}")
+    if stderr:
+        lines.append(f"Standard error:\n{tail(stderr)}")
+    return "\n".join(lines)
+
+
+def compile_code(code, language, project_name, candidate_result=None):
+    if candidate_result is not None:
+        # Déjà compilé pendant la sélection des candidats
+        result = candidate_result
+    else:
+        result = save_and_execute_code(code, language, project_name)
+    print(result)
+    # Garder le code renvoyé par la compilation s'il a été corrigé
+    compiled_code = code
+    if result.get("status") == "success" and "code" in result:
+        compiled_code = result["code"]
+    return {'compile_result': result, 'compiled_code': compiled_code, 'run_report': execution_report(result)}
+
+
+# 4. Test Validation
+def validate_generated_code(topic, language, compiled_code, run_report=None):
+    crew_test_validation = Crew(
+        agents=[test_validation_agent],
+        tasks=[TestValidationTask.validate_code(language, topic, compiled_code, run_report)],
+        process=Process.sequential,
+    )
+    return {'validation': crew_test_validation.kickoff()}
+
+
+# 5. Code Fix if needed
+def fix_generated_code(topic, language, project_name, compiled_code, validation, compile_result):
+    validation_status = TestValidationTask.extract_final_status(validation)
+    if not validation_status or validation_status.lower() == 'valid':
+        return {
+            'fixed_code': None,
+            'final_code': compiled_code,
+            'final_compile_result': compile_result
+        }
+
+    fixed_crew = Crew(
+        agents=[code_generator_agent],
+        tasks=[CodeFixTask.fix_code(topic, compiled_code, validation)],
+        process=Process.sequential,
+    )
+    fixed_code = fixed_crew.kickoff()
+    result = save_and_execute_code(fixed_code, language, project_name)
+    print(result)
+    return {
+        'fixed_code': fixed_code,
+        'final_code': fixed_code,
+        'final_compile_result': result
+    }
+
+
+# 6. Documentation
+def document_code(topic, language, final_code, speculative_documentation=None):
+    draft = speculative_documentation.get('draft') if speculative_documentation else None
+    if not isinstance(draft, Future):
+        # Brouillon absent ou restauré d'un checkpoint (la tâche ne survit pas au job)
+        draft = None
+    # La documentation spéculative n'est valable que si le code n'a pas changé depuis
+    if draft is not None and speculative_documentation['code'] == final_code:
+        try:
+            documentation = draft.result()
+        except Exception as e:
+            documentation = None
+            print(f"Documentation spéculative en échec : {e}")
+        if isinstance(documentation, str):
+            print("Documentation spéculative réutilisée")
+            return {'documentation': documentation_agent.create_pdf(documentation, topic)}
+    elif draft is not None:
+        # Brouillon sans effet de bord : annulé s'il n'a pas démarré, ignoré sinon
+        draft.cancel()
+        print("Code modifié par la correction : documentation spéculative ignorée")
+    return {'documentation': documentation_agent.generate_documentation(final_code, topic, language)}
+
+
+# Brouillons de documentation rédigés pendant la validation, hors du graphe d'étapes
+speculative_executor = ThreadPoolExecutor(max_workers=SPECULATIVE_DOCS_WORKERS, thread_name_prefix='speculative-docs')
+
+
+def document_code_speculatively(topic, language, compiled_code, compile_result):
+    """
+    Lance la rédaction de la documentation dès que le code compile, en parallèle de la validation.
+    Un programme Python interrompu par le délai d'exécution (attente d'une saisie) compte comme compilé.
+    L'étape se termine tout de suite : la documentation finale attend le brouillon
+    seulement si le code n'a pas été corrigé entre-temps, et le PDF n'est créé qu'à ce moment.
+    """
+    if compile_result.get('status') not in ('success', 'timeout'):
+        return {'speculative_documentation': None}
+    # Le brouillon garde le contexte du job (événements, métriques)
+    context = contextvars.copy_context()
+    draft = speculative_executor.submit(context.run, documentation_agent.draft_documentation,
+                                        compiled_code, topic, language)
+    return {'speculative_documentation': {'code': compiled_code, 'draft': draft}}
+
+
+def build_generation_pipeline(speculative_docs=SPECULATIVE_DOCS, codegen_candidates=CODEGEN_CANDIDATES):
+    """
+    Graphe des étapes de génération, chacune déclarée par ses entrées et ses sorties.
+    """
+    stage_cache = StageCache() if os.getenv('STAGE_CACHE', '1') != '0' else None
+
+    if codegen_candidates > 1:
+        # Les candidats sont compilés pendant la génération : pas de cache d'étape
+        code_generation = Stage('code_generation', generate_code_candidates,
+                                inputs=('topic', 'language', 'planning', 'project_name'),
+                                outputs=('code', 'candidate_result'),
+                                agent='code_generator_agent')
+        compilation_inputs = ('code', 'language', 'project_name', 'candidate_result')
+    else:
+        code_generation = Stage('code_generation', generate_code,
+                                inputs=('topic', 'language', 'planning'), outputs=('code',),
+                                agent='code_generator_agent', cacheable=True,
+                                fingerprint=lambda topic, language, planning: llm_fingerprint(
+                                    code_generator_agent,
+                                    CodeGenerationTask.code_generation(topic, language, str(planning))))
+        compilation_inputs = ('code', 'language', 'project_name')
+
+    documentation_inputs = ('topic', 'language', 'final_code')
+    speculative_stages = []
+    if speculative_docs:
+        documentation_inputs += ('speculative_documentation',)
+        speculative_stages.append(
+            Stage('speculative_documentation', document_code_speculatively,
+                  inputs=('topic', 'language', 'compiled_code', 'compile_result'),
+                  outputs=('speculative_documentation',),
+                  agent='documentation_agent')
         )
-        results['current_step'] = 'testing'
-        validation_result = crew_test_validation.kickoff()
-        
-        # Traduire et formater les résultats de la validation
-      
-        results['data']['validation'] = validation_result
-
-        # 5. Code Fix if needed
-        validation_status = TestValidationTask.extract_final_status(validation_result)
-        if validation_status and validation_status.lower() != 'valid':
-            results['current_step'] = 'fixedCode'
-            fixed_crew = Crew(
-                agents=[code_generator_agent],
-                tasks=[CodeFixTask.fix_code(topic, code_generation_result, validation_result)],
-                process=Process.sequential,
-            )
-            code_result = fixed_crew.kickoff()
-            result = save_and_execute_code(code_result, language, "MonProjet")
-            results['data']['fixedCode'] = str(code_result)
-        else:
-            code_result = code_generation_result
-         
-        if result.get("status") == "success":
-            # Vérifier si le code a été modifié (nouveau code disponible)
-            if "code" in result:
-                print("nouveau code")
-                code_generation_result = result["code"]
-            # Sinon garder le code original
-            else:
-                print("ancienne code")
-                code_generation_result = code_generation_result
-        print(result)
-        if language.lower() == "python":
-            results['data']['compilation'] = {
-                'success': result.get('status') == 'success',
-                'message': result.get('message', ''),
-                'output': result.get('execution_output', '')
-            }
-        elif language.lower() == "cpp" or language.lower() == "c++":
-            results['data']['compilation'] = {
-                'success': result.get('status') == 'success',
-                'message': result.get('message', ''),
-                'output': result.get('compilation_output', '')
-            }
-        elif language.lower() == "java":
-            results['data']['compilation'] = {
-                'success': result.get('status') == 'success',
-                'message': result.get('message', ''),
-                'output': result.get('compilation_output', ''),
-                'class_files': [f.replace('.java', '.class') for f in result.get('files', []) if f.endswith('.java')]
-            }
 
+    return Pipeline(speculative_stages + [
+        Stage('requirements', analyse_requirements,
+              inputs=('topic', 'language'), outputs=('requirements',),
+              agent='requirement_analysis', cacheable=True,
+              fingerprint=lambda topic, language: llm_fingerprint(
+                  requirement_analysis, RequirementAnalysis.req(topic, language))),
+        Stage('planning', plan_tasks,
+              inputs=('topic', 'language', 'requirements'), outputs=('planning',),
+              agent='task_planner_agent', cacheable=True,
+              fingerprint=lambda topic, language, requirements: llm_fingerprint(
+                  task_planner_agent, TaskPlanning.plan_and_decompose(topic, language, requirements))),
+        code_generation,
+        Stage('compilation', compile_code,
+              inputs=compilation_inputs, outputs=('compile_result', 'compiled_code', 'run_report')),
+        Stage('testing', validate_generated_code,
+              inputs=('topic', 'language', 'compiled_code', 'run_report'), outputs=('validation',),
+              agent='test_validation_agent', cacheable=True,
+              fingerprint=lambda topic, language, compiled_code, run_report: llm_fingerprint(
+                  test_validation_agent,
+                  TestValidationTask.validate_code(language, topic, compiled_code, run_report))),
+        Stage('fixedCode', fix_generated_code,
+              inputs=('topic', 'language', 'project_name', 'compiled_code', 'validation', 'compile_result'),
+              outputs=('fixed_code', 'final_code', 'final_compile_result'),
+              agent='code_generator_agent'),
+        # Documentation : écrit le PDF servi par /download-pdf, jamais rejouée depuis le cache
+        Stage('documentation', document_code,
+              inputs=documentation_inputs, outputs=('documentation',),
+              agent='documentation_agent'),
+    ], cache=stage_cache)
 
 
-        # 6. Documentation
-        results['current_step'] = 'documentation'
-        documentation = documentation_agent.generate_documentation(code_result, topic,language)
-        
-  
-        results['data']['documentation'] = documentation
+generation_pipeline = build_generation_pipeline()
 
-        results['status'] = 'completed'
-        return jsonify(results)
 
-    except Exception as e:
-        raise e
+def restore_checkpoints(job, results, language):
+    """
+    Sorties des étapes déjà terminées par un précédent essai du job, recopiées dans `results`.
+    """
+    checkpoint = checkpoint_store.load(job.id)
+    if not checkpoint:
+        return {}
+    restored = {}
+    # Dans l'ordre du graphe, pour que la compilation finale remplace la première
+    for stage in generation_pipeline.stages:
+        outputs = checkpoint['stages'].get(stage.name)
+        if outputs is None:
+            continue
+        publish_stage_output(results, language, outputs)
+        emit_event('stage_restored', stage=stage.name, agent=stage.agent)
+        restored.update(outputs)
+    return restored
 
 
-PDF_FOLDER = 'pdfs'
+def run_pipeline(topic, language, results):
+    """
+    Exécute le graphe de génération en mettant à jour `results` au fur et à mesure.
+    Chaque sortie d'étape est sauvegardée pour pouvoir reprendre le job s'il échoue.
+    """
+    job = current_job.get()
+    checkpoints = checkpoint_store if job is not None else None
+    initial = {'topic': topic, 'language': language, 'project_name': "MonProjet"}
+    if checkpoints is not None:
+        initial.update(restore_checkpoints(job, results, language))
+        checkpoints.start(job)
+
+    def on_output(stage, outputs):
+        publish_stage_output(results, language, outputs)
+        if checkpoints is not None:
+            checkpoints.save(job.id, stage.name, outputs)
+
+    failed = True
+    try:
+        with span('job', job_id=job.id if job else None, topic=topic, language=language), \
+                timed(PIPELINE_SECONDS, 'pipeline'):
+            generation_pipeline.run(
+                initial,
+                stage_context=lambda stage, cached: pipeline_stage(
+                    results, stage.name, stage.agent, output=STAGE_OUTPUTS.get(stage.name), cached=cached
+                ),
+                on_output=on_output
+            )
+        failed = False
+    finally:
+        # Fichiers générés et binaires du job : inutiles une fois le job terminé
+        release_workspace(failed=failed)
+
+    # Job terminé : plus rien à reprendre
+    if checkpoints is not None:
+        checkpoints.discard(job.id)
+    return results
 
 
 @app.route('/download-pdf/<project_name>')
@@ -248,258 +807,288 @@ def timeout(seconds):
 
 
 import shutil
-def save_and_execute_code(generated_code, language, project_name):
+
+
+def find_tool(env_name, windows_path, name):
+    """
+    Chemin d'un outil (compilateur, JVM) : variable d'environnement, chemin Windows
+    d'origine s'il existe, sinon l'outil trouvé dans le PATH.
+    """
+    path = os.getenv(env_name)
+    if path:
+        return path
+    if os.path.exists(windows_path):
+        return windows_path
+    return shutil.which(name) or windows_path
+
+
+def run_program(execute, entry, language):
+    """
+    Exécute un programme avec `execute()` (voir runner.supervise) et renvoie le résultat
+    au format du pipeline : statut, sorties, statistiques et consommation.
+    """
+    run_span = start_span('run', language=language, entry=entry)
+    run_duration = 0.0
+    try:
+        execution = execute()
+        run_duration = execution['duration']
+
+        if execution['timed_out']:
+            result = {
+                "status": "timeout",
+                "message": f"L'exécution a dépassé le délai de {RUN_TIMEOUT_SECONDS} secondes",
+                "partial_output": execution['stdout'],
+                "partial_errors": execution['stderr']
+            }
+            logger.warning(f"Timeout lors de l'exécution: {result['message']}")
+        # Vérifier le code de retour
+        elif execution['returncode'] == 0:
+            result = {
+                "status": "success",
+                "message": f"Programme exécuté avec succès depuis {entry}",
+                "execution_output": execution['stdout']
+            }
+            if execution['stderr']:
+                result["execution_stderr"] = execution['stderr']
+        else:
+            result = {
+                "status": "error",
+                "message": f"Le programme s'est terminé avec une erreur (code {execution['returncode']})",
+                "execution_error": execution['stderr'],
+                "execution_output": execution['stdout']
+            }
+        result["returncode"] = execution['returncode']
+        # Volume et débit des sorties (tronquées au-delà des limites de capture)
+        result["output_stats"] = {'stdout': execution['stdout_stats'], 'stderr': execution['stderr_stats']}
+        # Temps CPU, pic de mémoire et durée réelle, sous les limites de sandbox.py
+        result["resources"] = execution['resources']
+
+    except Exception as e:
+        result = {
+            "status": "error",
+            "message": f"Erreur lors de l'exécution du programme : {str(e)}",
+            "execution_error": ""
+        }
+        logger.error(f"Erreur pendant l'exécution: {e}", exc_info=True)
+
+    finally:
+        COMPILE_SECONDS.observe(run_duration, language=language, phase='run')
+        record_job_timing('run', run_duration)
+        run_span.end()
+    return result
+
+
+def run_compiled_program(result, args, project_dir, entry, language, limits=None):
+    """
+    Exécute le programme qui vient d'être compilé et ajoute l'exécution au résultat de la compilation.
+    `status` et `message` restent ceux de la compilation ; l'issue de l'exécution est
+    dans `run_status` et `run_message`.
+    """
+    execution = run_program(lambda: run_command(args, project_dir, RUN_TIMEOUT_SECONDS, limits), entry, language)
+    result["run_status"] = execution.pop("status")
+    result["run_message"] = execution.pop("message")
+    result.update(execution)
+    return result
+
+
+def find_java_main_class(project_dir, java_files):
+    """
+    Nom complet (avec le package) de la première classe qui a une méthode main, ou None.
+    """
+    for java_file in java_files:
+        with open(os.path.join(project_dir, java_file), 'r', encoding='utf-8') as f:
+            source = f.read()
+        if JAVA_MAIN.search(source):
+            class_name = os.path.splitext(os.path.basename(java_file))[0]
+            package = JAVA_PACKAGE.search(source)
+            return f"{package.group(1)}.{class_name}" if package else class_name
+    return None
+
+
+def compile_cpp_project(generated_code, project_name, gpp_path):
+    """
+    Découpe le code C++ en fichiers, les sauvegarde et les compile (une seule passe, sans correction).
+    """
+    project_dir = project_workspace(project_name, 'cpp')
+    
+    # Définir exe_path avant de l'utiliser
+    exe_path = os.path.join(project_dir, 'main.exe')
+    
+    # Diviser le code en fichiers
+    file_blocks = split_code(generated_code, 'cpp')
+    
+    # Sauvegarder tous les fichiers
+    saved_files = []
+    for block in file_blocks:
+        file_path = os.path.join(project_dir, block['filename'])
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(block['content'])
+        saved_files.append(block['filename'])
+    
+    # Compiler chaque fichier .cpp à part (objets en cache), puis lier
+    cpp_files = [f for f in saved_files if f.endswith(('.cpp', '.cc', '.cxx'))]
+    if not cpp_files:  # Si aucun fichier .cpp n'est trouvé
+        print("Aucun fichier .cpp trouvé à compiler")
+        return {
+            "status": "error",
+            "message": "Aucun fichier .cpp trouvé à compiler",
+            "files": saved_files
+        }
+    
+    # Compiler et exécuter le programme
+    print("avant try")
+    try:
+        print(f"Compilation de {len(cpp_files)} fichier(s) avec {gpp_path} {' '.join(CPP_FLAGS)}")
+        with span('compile', language='cpp', files=len(cpp_files)), \
+                timed(COMPILE_SECONDS, 'compile', language='cpp', phase='compile'):
+            build = build_cpp_project(project_dir, cpp_files, exe_path, gpp_path)
+        
+        print(f"Code de retour de la compilation : {build['returncode']} "
+              f"({build['compiled']} compilé(s), {build['cached']} repris du cache)")
+        if build['stdout']:
+            print(f"Sortie de la compilation : {build['stdout']}")
+        if build['stderr']:
+            print(f"Erreur de compilation : {build['stderr']}")
+        
+        if build['returncode'] == 0:
+            print("Compilation successful!")
+            result = {
+                "status": "success",
+                "message": "Compilation successful!",
+                "files": saved_files,
+                "executable": exe_path,
+                "project_dir": project_dir,
+                "compilation_output": build['stdout'],
+                "code": generated_code
+            }
+            
+        else:
+            print("Compilation error!")
+            result = {
+                "status": "error",
+                "message": "Compilation error",
+                "compilation_error": build['stderr'],
+                "files": saved_files,
+                "code": generated_code
+            }
+    except Exception as e:
+        print(f"Erreur générale : {str(e)}")
+        result = {
+            "status": "error",
+            "message": f"Erreur lors de la compilation : {str(e)}",
+            "files": saved_files
+        }
+    print("après try")
+    return result
+
+
+def save_and_execute_code(generated_code, language, project_name, auto_fix=True):
 
     try:
         if "cpp" in language.lower() or "c++" in language.lower():
             # Définir le chemin vers g++
-            gpp_path = r"C:\Program Files (x86)\Dev-Cpp\MinGW64\bin\g++.exe"
-            
-            # Nettoyer le code généré
-            cleaned_code = generated_code.replace("```cpp", "").replace("```", "").strip()
-            
-            # Supprimer la section de documentation
-            if "### Fichiers générés ###" in cleaned_code:
-                code_parts = cleaned_code.split("### Fichiers générés ###")[1]
-                if "### Améliorations apportées ###" in code_parts:
-                    code_parts = code_parts.split("### Améliorations apportées ###")[0]
-                cleaned_code = code_parts.strip()
-            
-            project_dir = os.path.join(os.getcwd(), 'generated_projects\cppProjet', project_name)
-            os.makedirs(project_dir, exist_ok=True)
-            
-            # Définir exe_path avant de l'utiliser
-            exe_path = os.path.join(project_dir, 'main.exe')
-            
-            # Diviser le code en fichiers
-            current_file = None
-            current_content = []
-            file_blocks = []
+            gpp_path = find_tool('GPP_PATH', r"C:\Program Files (x86)\Dev-Cpp\MinGW64\bin\g++.exe", 'g++')
             
-            for line in cleaned_code.split('\n'):
-                line = line.rstrip()
-                # Vérifier si la ligne commence par // ou **
-                if line.strip().startswith('//') or line.strip().startswith('**'):
-                    comment = line.strip()
-                    # Enlever // ou ** du début et de la fin
-                    if comment.startswith('//'):
-                        comment = comment[2:].strip()
-                    elif comment.startswith('**'):
-                        # Enlever les ** du début et de la fin
-                        comment = comment[2:].strip()
-                        if comment.endswith('**'):
-                            comment = comment[:-2].strip()
-                    
-                    # Nettoyer le commentaire des numéros et points au début
-                    comment = comment.lstrip('0123456789. ')
-                    
-                    # Enlever le : à la fin si présent
-                    if comment.endswith(':'):
-                        comment = comment[:-1].strip()
-                    
-                    # Vérifier si le commentaire se termine par .h ou .cpp
-                    if comment.endswith('.h') or comment.endswith('.cpp'):
-                        if current_file:
-                            file_blocks.append({
-                                'filename': current_file,
-                                'content': '\n'.join(current_content)
-                            })
-                        current_file = comment
-                        current_content = []
-                    else:
-                        if current_file:
-                            current_content.append(line)
-                else:
-                    if current_file:
-                        current_content.append(line)
-            
-            if current_file:
-                file_blocks.append({
-                    'filename': current_file,
-                    'content': '\n'.join(current_content)
-                })
-            
-            # Si aucun fichier n'a été créé, créer un fichier main.cpp
-            if not file_blocks:
-                file_blocks.append({
-                    'filename': 'main.cpp',
-                    'content': cleaned_code
-                })
-            
-            # Sauvegarder tous les fichiers
-            saved_files = []
-            for block in file_blocks:
-                file_path = os.path.join(project_dir, block['filename'])
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(block['content'])
-                saved_files.append(block['filename'])
-            
-            # Compiler tous les fichiers .cpp ensemble
-            cpp_files = [f for f in saved_files if f.endswith('.cpp')]
-            if not cpp_files:  # Si aucun fichier .cpp n'est trouvé
-                print("Aucun fichier .cpp trouvé à compiler")
-                return {
-                    "status": "error",
-                    "message": "Aucun fichier .cpp trouvé à compiler",
-                    "files": saved_files
-                }
-            
-            cpp_paths = [os.path.join(project_dir, f) for f in cpp_files]
-            cpp_paths_quoted = [f'"{path}"' for path in cpp_paths]
-            compile_cmd = f'"{gpp_path}" -std=c++11 {" ".join(cpp_paths_quoted)} -o "{exe_path}"'
-            
-            # Compiler et exécuter le programme
-            print("avant try")
-            try:
-                print(f"Commande de compilation : {compile_cmd}")
-                compile_process = subprocess.run(compile_cmd, shell=True, capture_output=True, text=True)
-                
-                print(f"Code de retour de la compilation : {compile_process.returncode}")
-                if compile_process.stdout:
-                    print(f"Sortie de la compilation : {compile_process.stdout}")
-                if compile_process.stderr:
-                    print(f"Erreur de compilation : {compile_process.stderr}")
-                
-                if compile_process.returncode == 0:
-                    print("Compilation successful!")
-                    result = {
-                        "status": "success",
-                        "message": "Compilation successful!",
-                        "files": saved_files,
-                        "compilation_output": compile_process.stdout,
-                        "code": generated_code
-                    }
-                    
-                else:
-                    print("Compilation error!")
-                    result = {
-                        "status": "error",
-                        "message": "Compilation error",
-                        "compilation_error": compile_process.stderr,
-                        "files": saved_files,
-                        "code": generated_code
-                    }
-            except Exception as e:
-                print(f"Erreur générale : {str(e)}")
-                result = {
-                    "status": "error",
-                    "message": f"Erreur lors de la compilation : {str(e)}",
-                    "files": saved_files
-                }
-            print("après try")
-            # return result
-            if result["status"] == "success":
-                return result
+            # Compiler, puis corriger avec l'agent tant que l'erreur change,
+            # dans la limite du nombre de tentatives et du temps alloué
+            deadline = time.monotonic() + FIX_TIME_BUDGET
+            seen_errors = set()
+            cache_tried = set()
+            attempt = 0
+            # Dernière correction appliquée : code d'avant, erreurs visées et origine (cache ou llm)
+            last_fix = None
+            while True:
+                result = compile_cpp_project(generated_code, project_name, gpp_path)
+                result["fix_attempts"] = attempt
+                if result["status"] == "success":
+                    # Compilé : exécuter le programme dans son dossier, sous limites
+                    result = run_compiled_program(result, [result["executable"]], result["project_dir"],
+                                                  'main.exe', 'cpp')
+                signatures = error_signatures(result.get("compilation_error", ""))
+                if last_fix is not None and fix_cache is not None:
+                    resolved = [sig for sig in last_fix["signatures"] if sig not in signatures]
+                    # Mémoriser ce qui a fait disparaître une erreur pour ne plus payer le LLM
+                    if resolved and last_fix["source"] == "llm":
+                        fix_cache.store(language, resolved, last_fix["code"], generated_code, last_fix["stderr"])
+                    elif last_fix["source"] == "cache":
+                        result["fix_cache_hit"] = bool(resolved)
+                if result["status"] == "success" or not auto_fix or "compilation_error" not in result:
+                    return result
 
-            # Si compilation échouée
-            print("Erreur de compilation détectée. Suppression des fichiers et tentative de régénération...")
+                fingerprint = error_fingerprint(result["compilation_error"])
 
-            # Supprimer le dossier complet
-            try:
-                generated_dir = r"C:\Users\ALSAKB\Desktop\CrewAI-Projects-SMA-EL AOUNI IFADADEN\generated_projects\cppProjet"
-                if os.path.exists(generated_dir):
-                    shutil.rmtree(generated_dir)
-                    print(f"Directory deleted: {generated_dir}")
-            except Exception as e:
-                print(f"Error deleting directory: {e}")
+                # Essayer d'abord les corrections connues (quelques millisecondes)
+                if fix_cache is not None and fingerprint not in cache_tried and len(cache_tried) < MAX_FIX_ATTEMPTS:
+                    cache_tried.add(fingerprint)
+                    patched = fix_cache.apply(generated_code, signatures, language)
+                    if patched is not None:
+                        print(f"Correction connue appliquée pour l'erreur {fingerprint}")
+                        emit_event('compile_fix', attempt=attempt, fingerprint=fingerprint, source='cache')
+                        last_fix = {"code": generated_code, "signatures": signatures,
+                                    "stderr": result["compilation_error"], "source": "cache"}
+                        generated_code = patched
+                        continue
 
-            # Appeler l'agent pour corriger le code
-            try:
-                fixed_crew = Crew(
-                    agents=[code_generator_agent],
-                    tasks=[CodeFixTask2.fix_code(
-                        project_name=project_name,
-                        generated_code=generated_code,
-                        compilation_error=compile_process.stderr
-                    )],
-                    process=Process.sequential,
-                )
-                new_generated_code = fixed_crew.kickoff()
-                return save_and_execute_code(new_generated_code, language, project_name)
-            except Exception as agent_error:
-                return {
-                    "status": "error",
-                    "message": "Compilation and automatic correction error",
-                    "compilation_error": str(agent_error),
-                    "code": generated_code
-                }
+                stop_reason = None
+                if fingerprint in seen_errors:
+                    stop_reason = "same_error"
+                elif attempt >= MAX_FIX_ATTEMPTS:
+                    stop_reason = "max_attempts"
+                elif time.monotonic() >= deadline:
+                    stop_reason = "time_budget"
+                if stop_reason:
+                    print(f"Arrêt des corrections après {attempt} tentative(s) : {stop_reason}")
+                    emit_event('compile_fix_stopped', attempts=attempt, reason=stop_reason, fingerprint=fingerprint)
+                    result["fix_stop_reason"] = stop_reason
+                    return result
+                seen_errors.add(fingerprint)
+                attempt += 1
+
+                # Si compilation échouée (le dossier du projet est vidé à la prochaine compilation)
+                print(f"Erreur de compilation détectée ({fingerprint}). Tentative de correction {attempt}/{MAX_FIX_ATTEMPTS}...")
+                emit_event('compile_fix', attempt=attempt, fingerprint=fingerprint, source='llm')
+
+                # Appeler l'agent pour corriger le code
+                try:
+                    fixed_crew = Crew(
+                        agents=[code_generator_agent],
+                        tasks=[CodeFixTask2.fix_code(
+                            project_name=project_name,
+                            generated_code=generated_code,
+                            compilation_error=result["compilation_error"]
+                        )],
+                        process=Process.sequential,
+                    )
+                    with span('code_fix', language='cpp', project=project_name, attempt=attempt):
+                        last_fix = {"code": generated_code, "signatures": signatures,
+                                    "stderr": result["compilation_error"], "source": "llm"}
+                        generated_code = str(fixed_crew.kickoff())
+                except Exception as agent_error:
+                    return {
+                        "status": "error",
+                        "message": "Compilation and automatic correction error",
+                        "compilation_error": str(agent_error),
+                        "code": generated_code,
+                        "fix_attempts": attempt
+                    }
         
 
         elif "java" in language.lower():
             # Définir le chemin vers javac
-            javac_path = r"C:\Program Files\Java\jdk-18\bin\javac.exe"  # Ajustez selon votre installation
-            
-            # Nettoyer le code généré
-            cleaned_code = generated_code.replace("```java", "").replace("```", "").strip()
-            
-            # Supprimer la section de documentation
-            if "### Fichiers générés ###" in cleaned_code:
-                code_parts = cleaned_code.split("### Fichiers générés ###")[1]
-                if "### Améliorations apportées ###" in code_parts:
-                    code_parts = code_parts.split("### Améliorations apportées ###")[0]
-                cleaned_code = code_parts.strip()
+            javac_path = find_tool('JAVAC_PATH', r"C:\Program Files\Java\jdk-18\bin\javac.exe", 'javac')  # Ajustez selon votre installation
+            java_path = find_tool('JAVA_PATH', r"C:\Program Files\Java\jdk-18\bin\java.exe", 'java')
             
-            project_dir = os.path.join(os.getcwd(), 'generated_projects\javaProjet', project_name)
-            os.makedirs(project_dir, exist_ok=True)
+            project_dir = project_workspace(project_name, 'java')
             
             # Diviser le code en fichiers
-            current_file = None
-            current_content = []
-            file_blocks = []
-            
-            for line in cleaned_code.split('\n'):
-                line = line.rstrip()
-                # Vérifier si la ligne commence par // ou **
-                if line.strip().startswith('//') or line.strip().startswith('**'):
-                    comment = line.strip()
-                    # Enlever // ou ** du début et de la fin
-                    if comment.startswith('//'):
-                        comment = comment[2:].strip()
-                    elif comment.startswith('**'):
-                        comment = comment[2:].strip()
-                        if comment.endswith('**'):
-                            comment = comment[:-2].strip()
-                    
-                    # Nettoyer le commentaire des numéros et points au début
-                    comment = comment.lstrip('0123456789. ')
-                    
-                    # Enlever le : à la fin si présent
-                    if comment.endswith(':'):
-                        comment = comment[:-1].strip()
-                    
-                    # Vérifier si le commentaire se termine par .java
-                    if comment.endswith('.java'):
-                        if current_file:
-                            file_blocks.append({
-                                'filename': current_file,
-                                'content': '\n'.join(current_content)
-                            })
-                        current_file = comment
-                        current_content = []
-                    else:
-                        if current_file:
-                            current_content.append(line)
-                else:
-                    if current_file:
-                        current_content.append(line)
-            
-            if current_file:
-                file_blocks.append({
-                    'filename': current_file,
-                    'content': '\n'.join(current_content)
-                })
-            
-            # Si aucun fichier n'a été créé, créer un fichier Main.java
-            if not file_blocks:
-                file_blocks.append({
-                    'filename': 'Main.java',
-                    'content': cleaned_code
-                })
+            file_blocks = split_code(generated_code, 'java')
             
             # Sauvegarder tous les fichiers
             saved_files = []
             for block in file_blocks:
                 file_path = os.path.join(project_dir, block['filename'])
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
                 with open(file_path, 'w', encoding='utf-8') as f:
                     f.write(block['content'])
                 saved_files.append(block['filename'])
@@ -517,25 +1106,40 @@ def save_and_execute_code(generated_code, language, project_name):
             # Créer la commande de compilation
             java_paths = [os.path.join(project_dir, f) for f in java_files]
             quoted_paths = [f'"{path}"' for path in java_paths]
-            compile_cmd = f'"{javac_path}" {" ".join(quoted_paths)}'
+            # Classes rangées selon leur package, pour pouvoir lancer la classe principale
+            compile_cmd = f'"{javac_path}" -d "{project_dir}" {" ".join(quoted_paths)}'
             
             print(f"Commande de compilation : {compile_cmd}")
             try:
-                compile_process = subprocess.run(compile_cmd, shell=True, capture_output=True, text=True)
+                with span('compile', language='java', files=len(java_files)), \
+                        timed(COMPILE_SECONDS, 'compile', language='java', phase='compile'):
+                    compile_process = subprocess.run(compile_cmd, shell=True, capture_output=True, text=True)
                 
                 if compile_process.returncode == 0:
                     print("Compilation réussie")
-                    return {
+                    result = {
                         "status": "success",
                         "message": "Compilation réussie",
                         "files": saved_files,
                         "code": generated_code
                     }
+                    main_class = find_java_main_class(project_dir, java_files)
+                    if not main_class:
+                        result["execution_skipped"] = "Aucune méthode main trouvée"
+                        return result
+                    # La JVM réserve beaucoup d'espace d'adressage : mémoire bornée par -Xmx
+                    limits = {name: value for name, value in run_limits().items() if name != 'RLIMIT_AS'}
+                    return run_compiled_program(
+                        result,
+                        [java_path, f"-Xmx{RUN_LIMIT_MEMORY_MB}m", '-cp', project_dir, main_class],
+                        project_dir, main_class, 'java', limits
+                    )
                 else:
                     print(f"Erreur de compilation : {compile_process.stderr}")
                     return {
                         "status": "error",
                         "message": f"Erreur de compilation : {compile_process.stderr}",
+                        "compilation_error": compile_process.stderr,
                         "files": saved_files,
                         "code": generated_code
                     }
@@ -552,62 +1156,12 @@ def save_and_execute_code(generated_code, language, project_name):
     
 
                 
-        elif "python" in generated_code:
-            # Enlever les marqueurs ```python et ```
-            cleaned_code = generated_code.replace("```python", "").replace("```", "")
-            
-            # Diviser le code en blocs basés sur les commentaires de fichiers
-            file_blocks = []
-            current_file = None
-            current_content = []
-            
-            # Traiter le code avec les commentaires de fichiers
-            for line in cleaned_code.split('\n'):
-                line = line.rstrip()  # Garder l'indentation, enlever les espaces à droite
-                # Vérifier si c'est un commentaire de fichier
-                if line.strip().startswith('#'):
-                    comment = line.strip()[1:].strip()
-                    # Vérifier si le commentaire contient un chemin de fichier
-                    if '/' in comment or '\\' in comment or comment.endswith('.py'):
-                        # Si on avait un fichier en cours, on le sauvegarde
-                        if current_file:
-                            file_blocks.append({
-                                'filename': current_file,
-                                'content': '\n'.join(current_content)
-                            })
-                        
-                        # Extraire le nom de fichier et le chemin
-                        file_path = comment.split('(')[0].strip()  # Enlever les parenthèses et leur contenu
-                        if not file_path.endswith('.py'):
-                            file_path += '.py'
-                        current_file = file_path
-                        current_content = []
-                    else:
-                        # C'est un commentaire normal, l'ajouter au contenu du fichier en cours
-                        if current_file:
-                            current_content.append(line)
-                else:
-                    # Ajouter la ligne au contenu du fichier en cours
-                    if current_file:
-                        current_content.append(line)
-            
-            # Ne pas oublier le dernier fichier
-            if current_file:
-                file_blocks.append({
-                    'filename': current_file,
-                    'content': '\n'.join(current_content)
-                })
-            
-            # Si aucun fichier n'a été créé, créer un fichier main.py
-            if not file_blocks:
-                file_blocks.append({
-                    'filename': 'main.py',
-                    'content': cleaned_code
-                })
+        elif "python" in language.lower():
+            # Diviser le code en fichiers
+            file_blocks = split_code(generated_code, 'python')
             
             # Créer le dossier du projet
-            project_dir = os.path.join(os.getcwd(), 'generated_projects', project_name)
-            os.makedirs(project_dir, exist_ok=True)
+            project_dir = project_workspace(project_name, 'python')
             
             # Sauvegarder tous les fichiers
             saved_files = []
@@ -643,106 +1197,12 @@ def save_and_execute_code(generated_code, language, project_name):
             
             # Exécuter le code si c'est Python et qu'on a un fichier principal
             if language.lower() == 'python' and main_file:
-                python_path = sys.executable
-                file_path = os.path.join(project_dir, main_file)
-                
-                # Configurer l'environnement
-                env = os.environ.copy()
-                env['PYTHONWARNINGS'] = 'ignore'
-                
-                try:
-                    logger.info(f"Tentative d'exécution du fichier principal: {file_path}")
-                    
-                    # Créer un processus avec un timeout
-                    process = subprocess.Popen(
-                        [python_path, file_path],
-                        stdin=subprocess.PIPE,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        text=True,
-                        bufsize=1,
-                        universal_newlines=True,
-                        cwd=project_dir,
-                        env=env
-                    )
-                    
-                    # Définir le timeout (par exemple 30 secondes)
-                    timeout_seconds = 30
-                    start_time = time.time()
-                    output_lines = []
-                    error_lines = []
-                    
-                    # Fonction pour lire la sortie sans bloquer
-                    def read_output(pipe, lines):
-                        for line in iter(pipe.readline, ''):
-                            lines.append(line.strip())
-                            if time.time() - start_time > timeout_seconds:
-                                break
-
-                    # Démarrer les threads de lecture
-                    stdout_thread = threading.Thread(target=read_output, args=(process.stdout, output_lines))
-                    stderr_thread = threading.Thread(target=read_output, args=(process.stderr, error_lines))
-                    stdout_thread.daemon = True
-                    stderr_thread.daemon = True
-                    stdout_thread.start()
-                    stderr_thread.start()
-
-                    # Attendre la fin du processus ou le timeout
-                    while process.poll() is None:
-                        if time.time() - start_time > timeout_seconds:
-                            process.terminate()  # Tenter une terminaison propre
-                            try:
-                                process.wait(timeout=5)  # Attendre 5 secondes pour la terminaison
-                            except subprocess.TimeoutExpired:
-                                process.kill()  # Forcer la terminaison si nécessaire
-                            raise TimeoutError(f"L'exécution a dépassé le délai de {timeout_seconds} secondes")
-                        time.sleep(0.1)
-
-                    # Attendre que les threads de lecture se terminent
-                    stdout_thread.join(timeout=1)
-                    stderr_thread.join(timeout=1)
-
-                    # Vérifier le code de retour
-                    if process.returncode == 0:
-                        result = {
-                            "status": "success",
-                            "message": f"Programme exécuté avec succès depuis {main_file}",
-                            "execution_output": "\n".join(output_lines).strip()
-                        }
-                        if error_lines:
-                                result["execution_stderr"] = "\n".join(error_lines).strip()
-                    else:
-                        result = {
-                            "status": "error",
-                            "message": f"Le programme s'est terminé avec une erreur (code {process.returncode})",
-                            "execution_error": "\n".join(error_lines).strip(),
-                            "execution_output": "\n".join(output_lines).strip()
-                        }
-
-                except TimeoutError as e:
-                    result = {
-                        "status": "timeout",
-                        "message": str(e),
-                        "partial_output": "\n".join(output_lines).strip(),
-                        "partial_errors": "\n".join(error_lines).strip()
-                    }
-                    logger.warning(f"Timeout lors de l'exécution: {str(e)}")
-
-                except Exception as e:
-                    result = {
-                        "status": "error",
-                        "message": f"Erreur lors de l'exécution du programme : {str(e)}",
-                        "execution_error": "\n".join(error_lines).strip()
-                    }
-                    logger.error(f"Erreur pendant l'exécution: {e}", exc_info=True)
-
-                finally:
-                    # Nettoyage
-                    try:
-                        process.stdout.close()
-                        process.stderr.close()
-                    except:
-                         pass
+                logger.info(f"Tentative d'exécution du fichier principal: {os.path.join(project_dir, main_file)}")
+                # Interpréteur préchauffé du pool, attente des sorties sans sondage
+                result = run_program(
+                    lambda: python_executor.run(project_dir, main_file, timeout=RUN_TIMEOUT_SECONDS),
+                    main_file, 'python'
+                )
             
             return result
             
@@ -764,4 +1224,6 @@ signal.signal(signal.SIGTERM, signal_handler)
 
 
 if __name__ == '__main__':
+    # Interpréteurs prêts avant la première exécution de code Python
+    python_executor.warm_up()
     app.run(host='127.0.0.1', port=5000, debug=False)
\ No newline at end of file
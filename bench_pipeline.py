@@ -0,0 +1,60 @@
+"""
+Benchmark du pipeline complet hors ligne, avec les réponses LLM rejouées depuis une cassette.
+
+    LLM_MODE=record python bench_pipeline.py --topic "Gestion de bibliothèque"   # une fois, en ligne
+    python bench_pipeline.py --topic "Gestion de bibliothèque" --runs 5           # ensuite, hors ligne
+
+Le temps mesuré est celui de notre code (orchestration, parsing, compilation,
+PDF) plus la latence simulée (--latency), sans la latence du fournisseur.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hors ligne du pipeline de génération")
+    parser.add_argument('--topic', required=True)
+    parser.add_argument('--language', default='python')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.0, help="latence simulée par appel LLM (s)")
+    parser.add_argument('--cassette', default=None)
+    args = parser.parse_args()
+
+    # La configuration est lue à l'import des agents : la fixer avant
+    os.environ.setdefault('LLM_MODE', 'replay')
+    os.environ['LLM_REPLAY_LATENCY'] = str(args.latency)
+    os.environ['LLM_CACHE'] = '0'
+    # Sans cache d'étapes : chaque exécution appelle (ou enregistre) tous les LLM
+    os.environ['STAGE_CACHE'] = '0'
+    if args.cassette:
+        os.environ['LLM_CASSETTE'] = args.cassette
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from app import run_pipeline
+    from jobs import job_store, run_job
+
+    runs = 1 if os.environ['LLM_MODE'] == 'record' else args.runs
+    stage_durations = defaultdict(list)
+    totals = []
+    for run in range(runs):
+        job = job_store.create(args.topic, args.language)
+        start = time.perf_counter()
+        run_job(job, run_pipeline)
+        totals.append(time.perf_counter() - start)
+        if job.results['status'] != 'completed':
+            print(f"Exécution {run + 1} en erreur : {job.error}")
+            sys.exit(1)
+        for event in job.events:
+            if event['event'] == 'stage_end':
+                stage_durations[event['data']['stage']].append(event['data']['duration'])
+
+    print(f"\n=== Pipeline {args.language} ({runs} exécutions, mode {os.environ['LLM_MODE']}) ===")
+    for stage, durations in stage_durations.items():
+        print(f"{stage:<16}: {sum(durations) / len(durations) * 1000:9.1f} ms")
+    print(f"{'total':<16}: {sum(totals) / len(totals) * 1000:9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark du chemin de recherche web (WebSearchTool) contre le serveur Serper local.
+
+    python bench_search.py --requests 500 --concurrency 8 --latency 0.05
+
+Mesure le débit, les latences p50/p90/p99, le taux d'erreur et le coût de la
+mise en forme JSON des résultats (format_search_results).
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from serper_stub import StubConfig, build_response, start_stub_server
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(p / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def report(title, latencies, errors, elapsed):
+    count = len(latencies)
+    print(f"\n=== {title} ===")
+    print(f"requêtes      : {count} ({errors} erreurs)")
+    print(f"durée totale  : {elapsed:.3f} s")
+    print(f"débit         : {count / elapsed:.1f} req/s")
+    print(f"latence p50   : {percentile(latencies, 50) * 1000:.2f} ms")
+    print(f"latence p90   : {percentile(latencies, 90) * 1000:.2f} ms")
+    print(f"latence p99   : {percentile(latencies, 99) * 1000:.2f} ms")
+
+
+def bench_sync(tool, queries, concurrency, num_results, is_error):
+    def one(query):
+        start = time.perf_counter()
+        output = tool._run(query, num_results)
+        return time.perf_counter() - start, is_error(output)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(one, queries))
+    elapsed = time.perf_counter() - start
+    report(f"_run, {concurrency} threads", [s[0] for s in samples], sum(s[1] for s in samples), elapsed)
+
+
+def bench_async(tool, queries, batch_size, num_results, is_error):
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch_size):
+        batch = queries[i:i + batch_size]
+        batch_start = time.perf_counter()
+        outputs = tool.search_many(batch, num_results)
+        latencies.append(time.perf_counter() - batch_start)
+        errors += sum(is_error(output) for output in outputs)
+    elapsed = time.perf_counter() - start
+    print(f"\n(latences par lot de {batch_size} requêtes)")
+    report(f"search_many, lots de {batch_size}", latencies, errors, elapsed)
+
+
+def bench_formatting(format_search_results, config, num_results, iterations):
+    payload = build_response("benchmark query", config.results, config)
+    raw = json.dumps(payload)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        json.loads(raw)
+    parse = (time.perf_counter() - start) / iterations
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        format_search_results(payload, num_results)
+    formatting = (time.perf_counter() - start) / iterations
+
+    print("\n=== Mise en forme JSON ===")
+    print(f"réponse brute : {len(raw)} octets, {config.results} résultats")
+    print(f"json.loads    : {parse * 1e6:.1f} µs/appel")
+    print(f"format        : {formatting * 1e6:.1f} µs/appel")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de WebSearchTool via un Serper local")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--num-results', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--results', type=int, default=10)
+    parser.add_argument('--snippet-bytes', type=int, default=160)
+    parser.add_argument('--same-query', action='store_true',
+                        help="envoyer toujours la même requête (mesure la déduplication)")
+    parser.add_argument('--format-iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    config = StubConfig(args.latency, args.jitter, args.error_rate, 500,
+                        args.results, args.snippet_bytes)
+    server, url = start_stub_server(config)
+
+    # La configuration de tools.py est lue à l'import : la fixer avant
+    os.environ['SERPER_URL'] = url
+    os.environ['SERPER_API_KEY'] = 'benchmark'
+    os.environ['SEARCH_CACHE'] = '0'
+    os.environ.setdefault('SERPER_BACKOFF', '0.01')
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from tools import WebSearchTool, format_search_results, is_search_error
+
+    tool = WebSearchTool()
+    if args.same_query:
+        queries = ["best practices for python"] * args.requests
+    else:
+        queries = [f"best practices for python {i}" for i in range(args.requests)]
+
+    print(f"Serveur local : {url} (latence {args.latency}s ± {args.jitter}s, erreurs {args.error_rate:.0%})")
+    bench_sync(tool, queries, args.concurrency, args.num_results, is_search_error)
+    bench_async(tool, queries, args.concurrency, args.num_results, is_search_error)
+    bench_formatting(format_search_results, config, args.num_results, args.format_iterations)
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
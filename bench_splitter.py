@@ -0,0 +1,88 @@
+"""
+Benchmark du découpage en fichiers (code_splitter) sur des sorties LLM de plusieurs Mo.
+
+    python bench_splitter.py --files 400 --lines 300 --runs 5
+
+Compare split_code à l'ancien parseur ligne à ligne de save_and_execute_code (C++).
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from code_splitter import split_code
+
+
+def legacy_split_cpp(generated_code):
+    # Ancienne version, gardée ici comme référence
+    cleaned_code = generated_code.replace("```cpp", "").replace("```", "").strip()
+    current_file = None
+    current_content = []
+    file_blocks = []
+    for line in cleaned_code.split('\n'):
+        line = line.rstrip()
+        if line.strip().startswith('//') or line.strip().startswith('**'):
+            comment = line.strip()
+            if comment.startswith('//'):
+                comment = comment[2:].strip()
+            elif comment.startswith('**'):
+                comment = comment[2:].strip()
+                if comment.endswith('**'):
+                    comment = comment[:-2].strip()
+            comment = comment.lstrip('0123456789. ')
+            if comment.endswith(':'):
+                comment = comment[:-1].strip()
+            if comment.endswith('.h') or comment.endswith('.cpp'):
+                if current_file:
+                    file_blocks.append({'filename': current_file, 'content': '\n'.join(current_content)})
+                current_file = comment
+                current_content = []
+            elif current_file:
+                current_content.append(line)
+        elif current_file:
+            current_content.append(line)
+    if current_file:
+        file_blocks.append({'filename': current_file, 'content': '\n'.join(current_content)})
+    return file_blocks
+
+
+def make_output(files, lines):
+    """
+    Sortie LLM synthétique : texte d'introduction puis `files` fichiers en blocs markdown.
+    """
+    parts = ["Voici le projet demandé, découpé en fichiers :\n"]
+    for index in range(files):
+        header = f"// src/module{index}/task{index}.cpp" if index % 2 else f"** task{index}.h **"
+        body = [f"    // étape {line} du traitement\n    value += compute({line}, \"{index}\");"
+                for line in range(lines // 2)]
+        parts.append(f"```cpp\n{header}\n#include <string>\nint f{index}() {{\n" + "\n".join(body) + "\n}\n```\n")
+    return "\n".join(parts)
+
+
+def bench(name, func, text, runs):
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        blocks = func(text)
+        durations.append(time.perf_counter() - start)
+    best = min(durations)
+    size_mb = len(text.encode('utf-8')) / 1e6
+    print(f"{name:<14}: {best * 1000:8.1f} ms  ({size_mb / best:6.1f} Mo/s, {len(blocks)} fichiers)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du découpage en fichiers")
+    parser.add_argument('--files', type=int, default=400)
+    parser.add_argument('--lines', type=int, default=300)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    text = make_output(args.files, args.lines)
+    print(f"Sortie : {len(text.encode('utf-8')) / 1e6:.1f} Mo, {args.files} fichiers")
+    bench('split_code', lambda code: split_code(code, 'cpp'), text, args.runs)
+    bench('ancien parseur', legacy_split_cpp, text, args.runs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+from opentelemetry.trace import Status, StatusCode
+
+from jobs import emit_event
+from metrics import LLM_CALLS, LLM_SECONDS, LLM_TOKENS, record_job_timing, record_job_usage
+from tracing import start_span
+
+
+# Estimation utilisée quand le fournisseur ne renvoie pas le nombre de tokens
+CHARS_PER_TOKEN = 4
+
+
+class JobStreamHandler(BaseCallbackHandler):
+    """
+    Relaie les tokens du LLM vers le flux d'événements du job courant.
+    Si le modèle ne diffuse pas token par token, la réponse complète
+    est publiée à la fin de l'appel.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._streamed_runs = set()
+
+    def on_llm_new_token(self, token, *, run_id=None, **kwargs):
+        self._streamed_runs.add(run_id)
+        emit_event('token', token=token)
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        if run_id in self._streamed_runs:
+            self._streamed_runs.discard(run_id)
+            return
+        for generations in response.generations:
+            for generation in generations:
+                if generation.text:
+                    emit_event('token', token=generation.text)
+
+    def on_llm_error(self, error, *, run_id=None, **kwargs):
+        self._streamed_runs.discard(run_id)
+        emit_event('llm_error', error=str(error))
+
+
+def token_usage(response, estimated_input):
+    """
+    (tokens en entrée, tokens en sortie) d'une réponse LLM, estimés si le fournisseur ne les donne pas.
+    """
+    usage = (response.llm_output or {}).get('token_usage') or {}
+    input_tokens = usage.get('prompt_tokens', usage.get('input_tokens'))
+    output_tokens = usage.get('completion_tokens', usage.get('output_tokens'))
+
+    text = ''
+    for generations in response.generations:
+        for generation in generations:
+            text += generation.text
+            metadata = getattr(getattr(generation, 'message', None), 'usage_metadata', None) or {}
+            if input_tokens is None and 'input_tokens' in metadata:
+                input_tokens = metadata['input_tokens']
+            if output_tokens is None and 'output_tokens' in metadata:
+                output_tokens = metadata['output_tokens']
+
+    if input_tokens is None:
+        input_tokens = estimated_input
+    if output_tokens is None:
+        output_tokens = len(text) // CHARS_PER_TOKEN
+    return input_tokens, output_tokens
+
+
+# Clé de generation_info indiquant d'où vient une réponse qui n'a pas été demandée au fournisseur
+LLM_SOURCE_KEY = 'llm_source'
+
+
+def mark_generations(generations, source):
+    """
+    Copies des générations marquées `source` ('cache' ou 'shared') dans generation_info.
+    Les originaux ne sont pas modifiés : ils appartiennent à l'appel qui les a produits.
+    """
+    return [
+        generation.copy(update={'generation_info': dict(generation.generation_info or {}, **{LLM_SOURCE_KEY: source})})
+        for generation in generations
+    ]
+
+
+def response_source(response):
+    """
+    'network' pour une réponse du fournisseur, sinon 'cache' ou 'shared' (voir mark_generations).
+    """
+    for generations in response.generations:
+        for generation in generations:
+            source = (generation.generation_info or {}).get(LLM_SOURCE_KEY)
+            if source:
+                return source
+    return 'network'
+
+
+class MetricsHandler(BaseCallbackHandler):
+    """
+    Compte les appels LLM, leur durée et les tokens consommés (métriques globales et par job).
+    Les réponses reprises du cache (llm_cache) ou d'un appel identique en cours
+    (llm_flight) sont comptées à part : elles ne coûtent ni appel ni tokens.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._runs = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id=None, **kwargs):
+        chars = sum(len(str(message.content)) for batch in messages for message in batch)
+        self._runs[run_id] = (time.perf_counter(), chars // CHARS_PER_TOKEN)
+
+    def on_llm_start(self, serialized, prompts, *, run_id=None, **kwargs):
+        chars = sum(len(prompt) for prompt in prompts)
+        self._runs[run_id] = (time.perf_counter(), chars // CHARS_PER_TOKEN)
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        start, estimated_input = self._runs.pop(run_id, (None, 0))
+        source = response_source(response)
+        LLM_CALLS.inc(status='success', source=source)
+        if source == 'cache':
+            record_job_usage(llm_cache_hits=1)
+            return
+        if source == 'shared':
+            record_job_usage(llm_shared_calls=1)
+            return
+        input_tokens, output_tokens = token_usage(response, estimated_input)
+        LLM_TOKENS.inc(input_tokens, direction='input')
+        LLM_TOKENS.inc(output_tokens, direction='output')
+        record_job_usage(llm_calls=1, input_tokens=input_tokens, output_tokens=output_tokens)
+        if start is not None:
+            duration = time.perf_counter() - start
+            LLM_SECONDS.observe(duration)
+            record_job_timing('llm', duration)
+
+    def on_llm_error(self, error, *, run_id=None, **kwargs):
+        self._runs.pop(run_id, None)
+        LLM_CALLS.inc(status='error', source='network')
+
+
+class TracingHandler(BaseCallbackHandler):
+    """
+    Ouvre un span OpenTelemetry par appel LLM, enfant de l'étape en cours.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._spans = {}
+
+    def _start(self, run_id, serialized, prompt_chars):
+        model = ((serialized or {}).get('kwargs') or {}).get('model')
+        self._spans[run_id] = start_span('llm', model=model, prompt_chars=prompt_chars)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id=None, **kwargs):
+        self._start(run_id, serialized,
+                    sum(len(str(message.content)) for batch in messages for message in batch))
+
+    def on_llm_start(self, serialized, prompts, *, run_id=None, **kwargs):
+        self._start(run_id, serialized, sum(len(prompt) for prompt in prompts))
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            span.set_attribute('output_chars', sum(
+                len(generation.text) for generations in response.generations for generation in generations
+            ))
+            span.end()
+
+    def on_llm_error(self, error, *, run_id=None, **kwargs):
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            span.record_exception(error)
+            span.set_status(Status(StatusCode.ERROR, str(error)))
+            span.end()
+
+
+job_stream_handler = JobStreamHandler()
+metrics_handler = MetricsHandler()
+tracing_handler = TracingHandler()
+
+# Callbacks attachés au LLM partagé par les agents
+llm_callbacks = [job_stream_handler, metrics_handler, tracing_handler]
@@ -0,0 +1,148 @@
+"""
+Enregistrement / rejeu des réponses LLM ("cassette") pour exécuter le pipeline hors ligne.
+
+    LLM_MODE=record  python app.py   # appels réels, réponses enregistrées
+    LLM_MODE=replay  python app.py   # réponses rejouées, aucun appel réseau
+
+En rejeu, les recherches web doivent aussi être hors ligne : garder le cache
+de recherche rempli pendant l'enregistrement (SEARCH_CACHE_TTL suffisant) ou
+pointer SERPER_URL vers serper_stub.py.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+# live | record | replay
+LLM_MODE = os.getenv('LLM_MODE', 'live')
+LLM_CASSETTE = os.getenv('LLM_CASSETTE', os.path.join('cassettes', 'pipeline.json'))
+# Latence simulée par appel en rejeu (secondes)
+LLM_REPLAY_LATENCY = float(os.getenv('LLM_REPLAY_LATENCY', '0'))
+# En rejeu strict, un prompt inconnu est une erreur ; sinon on rejoue dans l'ordre d'enregistrement
+LLM_CASSETTE_STRICT = os.getenv('LLM_CASSETTE_STRICT', '0') == '1'
+
+
+class CassetteMissError(KeyError):
+    pass
+
+
+def cassette_key(messages, stop=None):
+    """
+    Clé déterministe d'un appel : type et contenu des messages, séquences d'arrêt.
+    """
+    payload = json.dumps({
+        'messages': [[message.type, message.content] for message in messages],
+        'stop': stop
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class Cassette:
+    """
+    Fichier JSON des interactions enregistrées, dans l'ordre des appels.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.interactions = []
+        self._by_key = {}
+        self._cursor = 0
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.interactions = json.load(f).get('interactions', [])
+        for index, interaction in enumerate(self.interactions):
+            self._by_key.setdefault(interaction['key'], []).append(index)
+
+    def find(self, key, strict=LLM_CASSETTE_STRICT):
+        with self._lock:
+            indexes = self._by_key.get(key)
+            if indexes:
+                # Rejouer les réponses d'un même prompt dans l'ordre, puis garder la dernière
+                index = indexes.pop(0) if len(indexes) > 1 else indexes[0]
+                self._cursor = max(self._cursor, index + 1)
+                return self.interactions[index]
+            if strict or self._cursor >= len(self.interactions):
+                raise CassetteMissError(f"Aucune réponse enregistrée pour ce prompt ({key[:12]})")
+            interaction = self.interactions[self._cursor]
+            self._cursor += 1
+            return interaction
+
+    def record(self, key, text, preview):
+        with self._lock:
+            self.interactions.append({'key': key, 'text': text, 'prompt_preview': preview})
+            self._by_key.setdefault(key, []).append(len(self.interactions) - 1)
+            self._save()
+
+    def _save(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'interactions': self.interactions}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+class CassetteChatModel(BaseChatModel):
+    """
+    Modèle de chat qui enregistre (mode "record") les réponses du modèle réel
+    `inner`, ou les rejoue (mode "replay") avec une latence simulée.
+    """
+
+    cassette: Any
+    mode: str = 'replay'
+    latency: float = 0.0
+    inner: Any = None
+
+    @property
+    def _llm_type(self):
+        return 'cassette'
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        key = cassette_key(messages, stop)
+
+        if self.mode == 'record':
+            result = self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            preview = str(messages[-1].content)[:200] if messages else ''
+            self.cassette.record(key, result.generations[0].message.content, preview)
+            return result
+
+        interaction = self.cassette.find(key)
+        if self.latency > 0:
+            time.sleep(self.latency)
+        text = interaction['text']
+        if run_manager is not None:
+            run_manager.on_llm_new_token(text)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+
+@lru_cache(maxsize=None)
+def get_cassette(path):
+    # Une seule instance par fichier : plusieurs modèles (températures) y écrivent
+    return Cassette(path)
+
+
+def wrap_llm(llm, callbacks=None):
+    """
+    Renvoie `llm` tel quel en mode live, sinon le modèle cassette qui l'enveloppe.
+    """
+    if LLM_MODE not in ('record', 'replay'):
+        return llm
+    print(f"LLM en mode {LLM_MODE} (cassette : {LLM_CASSETTE})")
+    return CassetteChatModel(
+        cassette=get_cassette(LLM_CASSETTE),
+        mode=LLM_MODE,
+        latency=LLM_REPLAY_LATENCY,
+        inner=llm,
+        callbacks=callbacks,
+        # Le cache LLM global court-circuiterait l'enregistrement
+        cache=False
+    )
@@ -0,0 +1,109 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+
+# Sorties d'étapes de chaque job, pour reprendre un job en erreur (désactivable avec CHECKPOINTS=0)
+CHECKPOINT_DIR = os.getenv('CHECKPOINT_DIR', os.path.join('.cache', 'checkpoints'))
+# Durée de conservation des checkpoints des jobs non terminés (heures)
+CHECKPOINT_RETENTION_HOURS = float(os.getenv('CHECKPOINT_RETENTION_HOURS', '24'))
+
+JOB_FILE = 'job.json'
+
+_JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class CheckpointStore:
+    """
+    Un dossier par job : `job.json` (sujet, langage) et un fichier JSON par étape terminée.
+
+    Les sorties sont écrites dès que l'étape les produit ; un job repris repart
+    de ces valeurs et le pipeline saute les étapes déjà faites.
+    """
+
+    def __init__(self, directory=CHECKPOINT_DIR, retention_hours=CHECKPOINT_RETENTION_HOURS):
+        self.directory = directory
+        self.retention_hours = retention_hours
+        os.makedirs(directory, exist_ok=True)
+        self.purge()
+
+    def _job_dir(self, job_id):
+        # L'identifiant vient de l'URL : pas de chemin arbitraire
+        if not _JOB_ID.match(job_id):
+            raise ValueError(f"Identifiant de job invalide : {job_id}")
+        return os.path.join(self.directory, job_id)
+
+    @staticmethod
+    def _write(path, payload):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+
+    def start(self, job):
+        """
+        Enregistre le sujet et le langage du job (nécessaires pour le reprendre).
+        """
+        job_dir = self._job_dir(job.id)
+        os.makedirs(job_dir, exist_ok=True)
+        self._write(os.path.join(job_dir, JOB_FILE), {
+            'job_id': job.id,
+            'topic': job.topic,
+            'language': job.language,
+            'created_at': job.created_at
+        })
+
+    def save(self, job_id, stage_name, outputs):
+        job_dir = self._job_dir(job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        self._write(os.path.join(job_dir, f"stage-{stage_name}.json"), {
+            'stage': stage_name,
+            'time': time.time(),
+            'outputs': outputs
+        })
+
+    def load(self, job_id):
+        """
+        Renvoie {'job': ..., 'stages': {étape: sorties}} ou None si le job n'a pas de checkpoint.
+        """
+        job_dir = self._job_dir(job_id)
+        try:
+            with open(os.path.join(job_dir, JOB_FILE), 'r', encoding='utf-8') as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        stages = {}
+        for name in sorted(os.listdir(job_dir)):
+            if not (name.startswith('stage-') and name.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(job_dir, name), 'r', encoding='utf-8') as f:
+                    checkpoint = json.load(f)
+            except (OSError, ValueError):
+                # Fichier incomplet : l'étape sera refaite
+                continue
+            stages[checkpoint['stage']] = checkpoint['outputs']
+        return {'job': job, 'stages': stages}
+
+    def discard(self, job_id):
+        shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+
+    def purge(self):
+        """
+        Supprime les checkpoints plus vieux que la durée de conservation.
+        """
+        limit = time.time() - self.retention_hours * 3600
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.isdir(path) and os.path.getmtime(path) < limit:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                continue
+
+
+checkpoint_store = CheckpointStore() if os.getenv('CHECKPOINTS', '1') != '0' else None
@@ -0,0 +1,148 @@
+"""
+Découpage en fichiers du code renvoyé par le LLM.
+
+Le code arrive en un seul bloc où chaque fichier est précédé d'un commentaire
+portant son nom (`// task.h`, `** Main.java **`, `# utils/helpers.py`), parfois
+entouré de blocs markdown ``` et d'explications. Le découpage se fait en une passe, ligne par ligne.
+"""
+import posixpath
+import re
+
+
+# Extensions reconnues et marqueurs de commentaire des en-têtes de fichier, par langage
+LANGUAGE_RULES = {
+    'cpp': {
+        'extensions': ('cpp', 'cc', 'cxx', 'hpp', 'hh', 'h'),
+        'markers': ('//', r'\*\*'),
+        'default': 'main.cpp'
+    },
+    'java': {
+        'extensions': ('java',),
+        'markers': ('//', r'\*\*'),
+        'default': 'Main.java'
+    },
+    'python': {
+        'extensions': ('py',),
+        'markers': ('#', r'\*\*'),
+        'default': 'main.py'
+    },
+}
+
+# Section "fichiers" des réponses de correction, suivie d'un texte d'explication
+FILES_SECTION = '### Fichiers générés ###'
+END_SECTION = '### Améliorations apportées ###'
+
+# Lignes de bloc markdown (```cpp, ```), supprimées du code
+_FENCE = r'[ \t]*```[\w+#.-]*[ \t]*'
+
+
+def _line_pattern(rules):
+    # Une seule expression par langage, appliquée au texte entier (re.MULTILINE) :
+    # soit une ligne de bloc markdown, soit un en-tête de fichier comme
+    # "// 2. src/task.cpp :", "** Main.java **" ou "# File: utils/io.py (module d'E/S)"
+    return re.compile(
+        r'^(?:(?P<fence>' + _FENCE + r')|'
+        r'[ \t]*(?:' + '|'.join(rules['markers']) + r')[ \t]*'
+        r'(?:\d+[.)][ \t]*)?'
+        r'(?:(?:file|fichier)[ \t]*:[ \t]*)?'
+        r'[`*]*(?P<path>[\w.\-/\\]+\.(?:' + '|'.join(rules['extensions']) + r'))[`*]*'
+        r'[ \t]*(?:\([^)\n]*\))?[ \t]*:?[ \t]*(?:\*\*)?[ \t]*)$',
+        re.MULTILINE | re.IGNORECASE
+    )
+
+
+_LINES = {language: _line_pattern(rules) for language, rules in LANGUAGE_RULES.items()}
+_FENCE_LINES = re.compile(r'^' + _FENCE + r'\n?', re.MULTILINE)
+
+
+def normalize_language(language):
+    language = language.lower().strip()
+    if language in ('c++', 'cpp'):
+        return 'cpp'
+    return language
+
+
+def safe_path(path):
+    """
+    Chemin relatif au projet ; None s'il sortirait du dossier du projet.
+    """
+    path = posixpath.normpath(path.replace('\\', '/').lstrip('/'))
+    if path.startswith('..') or path in ('', '.'):
+        return None
+    return path
+
+
+def iter_files(code, language):
+    """
+    Parcourt le code une seule fois et produit (nom de fichier, contenu) pour chaque fichier.
+    Seules les lignes d'en-tête et de bloc markdown sont examinées par l'expression
+    régulière ; le contenu est recopié par tranches. Le texte avant le premier
+    en-tête (introduction) est ignoré. Si la réponse contient des blocs markdown,
+    seul leur contenu est gardé : le texte entre et après les blocs est de la prose.
+    """
+    fenced = _FENCE_LINES.search(code) is not None
+    inside = False
+    current_file = None
+    chunks = []
+    position = 0
+    for match in _LINES[normalize_language(language)].finditer(code):
+        keep = current_file and (inside or not fenced)
+        if keep:
+            chunks.append(code[position:match.start()])
+        position = match.end() + 1
+        if match.group('fence') is not None:
+            inside = not inside
+            continue
+        path = safe_path(match.group('path'))
+        if path is None:
+            # Nom de fichier refusé : la ligne reste dans le fichier courant
+            if keep:
+                chunks.append(code[match.start():position])
+            continue
+        if current_file:
+            yield current_file, ''.join(chunks)
+        current_file = path
+        chunks = []
+    if current_file:
+        # Bloc non refermé : la fin de la réponse est du code
+        if inside or not fenced:
+            chunks.append(code[position:])
+        yield current_file, ''.join(chunks)
+
+
+def fenced_content(code):
+    """
+    Contenu des blocs markdown de `code`, ou `code` entier s'il n'en a pas.
+    """
+    parts = _FENCE_LINES.split(code)
+    if len(parts) == 1:
+        return code
+    # Entre deux lignes de bloc, un morceau sur deux est du code (le premier est avant le premier bloc)
+    return ''.join(parts[1::2])
+
+
+def split_code(generated_code, language):
+    """
+    Découpe `generated_code` en [{'filename', 'content'}], dans l'ordre d'apparition.
+    Un fichier répété garde sa dernière version ; sans aucun en-tête, tout le code
+    va dans le fichier par défaut du langage.
+    """
+    language = normalize_language(language)
+    rules = LANGUAGE_RULES.get(language)
+    if rules is None:
+        raise ValueError(f"Langage non supporté : {language}")
+
+    code = str(generated_code).replace('\r\n', '\n')
+    if FILES_SECTION in code:
+        code = code.split(FILES_SECTION)[1]
+    if END_SECTION in code:
+        code = code.split(END_SECTION)[0]
+
+    files = {}
+    for filename, content in iter_files(code, language):
+        files[filename] = content.strip('\n') + '\n'
+
+    if not files:
+        files[rules['default']] = fenced_content(code).strip('\n') + '\n'
+
+    return [{'filename': filename, 'content': content} for filename, content in files.items()]
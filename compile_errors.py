@@ -0,0 +1,83 @@
+import hashlib
+import re
+
+
+# Lignes de diagnostic gcc/clang/javac : "fichier:ligne[:colonne]: error: message"
+_DIAGNOSTIC = re.compile(r'^(?P<file>.*?):(?P<line>\d+)(?::\d+)?:\s*(?:fatal\s+)?error:\s*(?P<message>.*)$')
+# Erreurs de l'éditeur de liens et tracebacks Python
+_LINKER = re.compile(r'(undefined reference to|multiple definition of|ld returned)')
+_PY_ERROR = re.compile(r'^(?P<type>[A-Za-z_][\w.]*(?:Error|Exception)):\s*(?P<message>.*)$')
+# Note de g++ qui accompagne une erreur due à un en-tête manquant (guillemets ASCII ou typographiques)
+_INCLUDE_HINT = re.compile(r"did you forget to [‘'`]#include ([<\"][^>\"]+[>\"])[’']")
+
+_ADDRESS = re.compile(r'0x[0-9a-fA-F]+')
+_NUMBER = re.compile(r'\b\d+\b')
+_TMP_PATH = re.compile(r'(?:[A-Za-z]:)?[\\/][^\s:\'"`]*[\\/]')
+
+
+def normalize_error_line(line):
+    """
+    Retire d'une ligne d'erreur ce qui change d'une exécution à l'autre :
+    chemins des dossiers, numéros de ligne et de colonne, adresses.
+    """
+    line = _TMP_PATH.sub('', line.strip())
+    line = _ADDRESS.sub('0x?', line)
+    return _NUMBER.sub('N', line)
+
+
+def line_signature(line):
+    """
+    Signature normalisée d'une ligne d'erreur, ou None si la ligne n'est pas une erreur.
+    """
+    match = _DIAGNOSTIC.match(line.strip())
+    if match:
+        filename = re.split(r'[\\/]', match.group('file'))[-1]
+        return f"{filename}: error: {normalize_error_line(match.group('message'))}"
+    match = _PY_ERROR.match(line.strip())
+    if match:
+        return f"{match.group('type')}: {normalize_error_line(match.group('message'))}"
+    if _LINKER.search(line):
+        return normalize_error_line(line)
+    return None
+
+
+def error_signatures(stderr):
+    """
+    Erreurs normalisées d'une sortie de compilateur (ou d'un traceback), sans doublons et triées.
+    Les avertissements et les lignes de contexte sont ignorés.
+    """
+    signatures = set()
+    for line in (stderr or '').splitlines():
+        signature = line_signature(line)
+        if signature:
+            signatures.add(signature)
+    if not signatures and (stderr or '').strip():
+        # Format inconnu : toute la sortie normalisée
+        signatures.add(normalize_error_line(' '.join(stderr.split())))
+    return sorted(signatures)
+
+
+def include_hints(stderr):
+    """
+    {signature: '#include <en-tête>'} d'après les notes de g++ qui suivent une erreur
+    ("did you forget to '#include <vector>'?").
+    """
+    hints = {}
+    current = None
+    for line in (stderr or '').splitlines():
+        signature = line_signature(line)
+        if signature:
+            current = signature
+            continue
+        match = _INCLUDE_HINT.search(line)
+        if match and current:
+            hints.setdefault(current, f"#include {match.group(1)}")
+    return hints
+
+
+def error_fingerprint(stderr):
+    """
+    Empreinte stable d'une erreur : identique si le compilateur renvoie les mêmes erreurs.
+    """
+    payload = '\n'.join(error_signatures(stderr))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
@@ -0,0 +1,213 @@
+"""
+Compilation C++ par unité de traduction, en parallèle, avec un cache de fichiers objets.
+
+Chaque .cpp est compilé à part (`g++ -c`) sur tous les cœurs, puis les objets
+sont liés. Un objet est réutilisé si le source, les en-têtes locaux qu'il inclut
+(`#include "..."`, récursivement), le compilateur et les options sont identiques :
+après une correction qui ne touche qu'un fichier, seul ce fichier est recompilé.
+"""
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+
+# Objets compilés réutilisables d'un job à l'autre (désactivable avec CPP_OBJECT_CACHE=0)
+CPP_OBJECT_CACHE_DIR = os.getenv('CPP_OBJECT_CACHE_DIR', os.path.join('.cache', 'objects'))
+CPP_OBJECT_CACHE_RETENTION_HOURS = float(os.getenv('CPP_OBJECT_CACHE_RETENTION_HOURS', '24'))
+# Options de compilation et nombre de compilations simultanées
+CPP_FLAGS = os.getenv('CPP_FLAGS', '-std=c++11').split()
+CPP_BUILD_JOBS = int(os.getenv('CPP_BUILD_JOBS', str(os.cpu_count() or 1)))
+
+# Dossier des objets dans le projet
+OBJECT_DIR = '.obj'
+
+_LOCAL_INCLUDE = re.compile(r'^[ \t]*#[ \t]*include[ \t]*"([^"\n]+)"', re.MULTILINE)
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def local_headers(project_dir, source):
+    """
+    En-têtes du projet inclus par `source` (chemin relatif), directement ou non, triés.
+    Un en-tête est cherché à côté du fichier qui l'inclut, puis à la racine du projet ;
+    les en-têtes introuvables (système, bibliothèques) sont ignorés.
+    """
+    found = set()
+    pending = [source]
+    while pending:
+        current = pending.pop()
+        try:
+            text = _read(os.path.join(project_dir, current)).decode('utf-8', errors='replace')
+        except OSError:
+            continue
+        for name in _LOCAL_INCLUDE.findall(text):
+            for candidate in (os.path.join(os.path.dirname(current), name), name):
+                candidate = os.path.normpath(candidate)
+                if candidate.startswith('..') or not os.path.isfile(os.path.join(project_dir, candidate)):
+                    continue
+                if candidate not in found:
+                    found.add(candidate)
+                    pending.append(candidate)
+                break
+    return sorted(found)
+
+
+@lru_cache(maxsize=None)
+def compiler_identity(compiler):
+    """
+    Version du compilateur (première ligne de --version) : un changement de compilateur invalide le cache.
+    """
+    try:
+        process = subprocess.run([compiler, '--version'], capture_output=True, text=True, timeout=30)
+        return f"{compiler}\n{process.stdout.splitlines()[0] if process.stdout else ''}"
+    except (OSError, subprocess.SubprocessError):
+        return compiler
+
+
+def object_key(project_dir, source, compiler, flags):
+    """
+    Hash du source, de ses en-têtes locaux (nom et contenu), du compilateur et des options.
+    """
+    digest = hashlib.sha256()
+    digest.update(compiler_identity(compiler).encode('utf-8'))
+    digest.update('\0'.join(flags).encode('utf-8'))
+    # Le chemin compte : il apparaît dans les messages et dans __FILE__
+    for path in [source] + local_headers(project_dir, source):
+        digest.update(b'\0' + path.replace(os.sep, '/').encode('utf-8') + b'\0')
+        digest.update(_read(os.path.join(project_dir, path)))
+    return digest.hexdigest()
+
+
+class ObjectCache:
+    """
+    Fichiers objets sur disque, un fichier par clé (voir object_key), avec les
+    avertissements du compilateur pour les réafficher quand l'objet est réutilisé.
+    """
+
+    def __init__(self, directory=CPP_OBJECT_CACHE_DIR, retention_hours=CPP_OBJECT_CACHE_RETENTION_HOURS):
+        self.directory = directory
+        self.retention_hours = retention_hours
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self.purge()
+
+    def _path(self, key, extension):
+        return os.path.join(self.directory, f"{key}.{extension}")
+
+    def get(self, key, object_path):
+        """
+        Copie l'objet en cache vers `object_path` ; renvoie les avertissements, ou None s'il est absent.
+        """
+        try:
+            shutil.copyfile(self._path(key, 'o'), object_path)
+            with open(self._path(key, 'log'), 'r', encoding='utf-8') as f:
+                warnings = f.read()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return warnings
+
+    def store(self, key, object_path, warnings=''):
+        tmp_suffix = f"{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            shutil.copyfile(object_path, f"{self._path(key, 'o')}.{tmp_suffix}")
+            with open(f"{self._path(key, 'log')}.{tmp_suffix}", 'w', encoding='utf-8') as f:
+                f.write(warnings or '')
+            # Le journal d'abord : un objet présent a toujours ses avertissements
+            os.replace(f"{self._path(key, 'log')}.{tmp_suffix}", self._path(key, 'log'))
+            os.replace(f"{self._path(key, 'o')}.{tmp_suffix}", self._path(key, 'o'))
+        except OSError:
+            return
+
+    def purge(self):
+        limit = time.time() - self.retention_hours * 3600
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < limit:
+                    os.remove(path)
+            except OSError:
+                continue
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+object_cache = ObjectCache() if os.getenv('CPP_OBJECT_CACHE', '1') != '0' else None
+
+
+def _compile_unit(project_dir, source, object_path, compiler, flags):
+    os.makedirs(os.path.dirname(os.path.join(project_dir, object_path)), exist_ok=True)
+    return subprocess.run([compiler, *flags, '-c', source, '-o', object_path],
+                          cwd=project_dir, capture_output=True, text=True)
+
+
+def build_cpp_project(project_dir, sources, exe_path, compiler, flags=None, jobs=CPP_BUILD_JOBS, cache=None):
+    """
+    Compile chaque source (chemins relatifs à `project_dir`) en objet, en parallèle
+    et en réutilisant le cache, puis lie l'exécutable `exe_path`.
+
+    Renvoie returncode, stdout et stderr (toutes les unités dans l'ordre de `sources`,
+    puis l'édition de liens), compiled et cached (nombre d'unités compilées / reprises du cache).
+    """
+    flags = list(CPP_FLAGS if flags is None else flags)
+    cache = object_cache if cache is None else cache
+    objects = {source: os.path.join(OBJECT_DIR, os.path.splitext(source)[0] + '.o') for source in sources}
+    outputs = {}
+    keys = {}
+    to_compile = []
+    for source in sources:
+        if cache is not None:
+            keys[source] = object_key(project_dir, source, compiler, flags)
+            object_path = os.path.join(project_dir, objects[source])
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            warnings = cache.get(keys[source], object_path)
+            if warnings is not None:
+                outputs[source] = (0, '', warnings)
+                continue
+        to_compile.append(source)
+
+    if to_compile:
+        with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(to_compile))),
+                                thread_name_prefix='cxx') as executor:
+            processes = {source: executor.submit(_compile_unit, project_dir, source, objects[source], compiler, flags)
+                         for source in to_compile}
+        for source, future in processes.items():
+            process = future.result()
+            outputs[source] = (process.returncode, process.stdout, process.stderr)
+            # Seules les compilations réussies vont dans le cache
+            if process.returncode == 0 and cache is not None:
+                cache.store(keys[source], os.path.join(project_dir, objects[source]), process.stderr)
+
+    returncode = next((outputs[source][0] for source in sources if outputs[source][0] != 0), 0)
+    stdout = [outputs[source][1] for source in sources]
+    stderr = [outputs[source][2] for source in sources]
+    if returncode == 0:
+        link = subprocess.run([compiler, *flags, *[objects[source] for source in sources], '-o', exe_path],
+                              cwd=project_dir, capture_output=True, text=True)
+        returncode = link.returncode
+        stdout.append(link.stdout)
+        stderr.append(link.stderr)
+
+    return {
+        'returncode': returncode,
+        'stdout': ''.join(stdout),
+        'stderr': ''.join(stderr),
+        'compiled': len(to_compile),
+        'cached': len(sources) - len(to_compile)
+    }
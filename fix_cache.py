@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from compile_errors import include_hints
+
+
+# Corrections déjà réussies, par signature d'erreur normalisée (désactivable avec FIX_CACHE=0)
+FIX_CACHE_DIR = os.getenv('FIX_CACHE_DIR', os.path.join('.cache', 'fixes'))
+FIX_CACHE_RETENTION_DAYS = float(os.getenv('FIX_CACHE_RETENTION_DAYS', '30'))
+
+# Lignes qu'on peut ajouter sans contexte : inclusions, espaces de noms.
+# Seul C++ a une boucle de correction de la compilation.
+DIRECTIVES = {
+    'cpp': re.compile(r'^\s*(#\s*include\s*[<"][^>"]+[>"]|using\s+namespace\s+[\w:]+\s*;)\s*$'),
+}
+
+_FENCE = re.compile(r'^\s*```')
+
+
+def language_key(language):
+    language = language.lower()
+    return 'cpp' if language in ('cpp', 'c++') else language
+
+
+def split_signature(signature):
+    """
+    "fichier: error: message" -> (fichier, message) ; (None, signature) sans nom de fichier.
+    """
+    filename, sep, message = signature.partition(': error: ')
+    if sep and filename and ' ' not in filename:
+        return filename, message
+    return None, signature
+
+
+def added_directives(old_code, new_code, language):
+    """
+    Directives (#include, using namespace) présentes dans `new_code` et absentes de `old_code`.
+    """
+    pattern = DIRECTIVES.get(language_key(language))
+    if pattern is None:
+        return []
+    present = {line.strip() for line in old_code.splitlines()}
+    added = []
+    for line in new_code.splitlines():
+        if pattern.match(line) and line.strip() not in present and line.strip() not in added:
+            added.append(line.strip())
+    return added
+
+
+def insert_directives(code, directives, filename=None):
+    """
+    Ajoute les directives absentes en tête du fichier `filename` (repéré par son
+    commentaire de nom de fichier), ou en tête du code.
+    """
+    lines = code.splitlines()
+    present = {line.strip() for line in lines}
+    missing = [directive for directive in directives if directive.strip() not in present]
+    if not missing:
+        return None
+
+    position = 0
+    if filename:
+        for index, line in enumerate(lines):
+            text = line.strip()
+            if text.startswith(('//', '**', '#')) and text.rstrip('*: ').endswith(filename) \
+                    and not text.startswith('#include'):
+                position = index + 1
+                break
+    if position == 0 and lines and _FENCE.match(lines[0]):
+        position = 1
+    lines[position:position] = [directive.strip() for directive in missing]
+    return '\n'.join(lines)
+
+
+class FixCache:
+    """
+    Pour chaque signature d'erreur, les directives (#include, using namespace) ajoutées par la
+    correction qui l'a fait disparaître.
+
+    Avant de payer un appel LLM, `apply` ajoute les directives manquantes en tête du
+    fichier en cause. Seul cet ajout est rejoué : il ne dépend pas du reste du
+    programme, contrairement à un diff, qui pourrait s'appliquer à un programme sans rapport.
+    """
+
+    def __init__(self, directory=FIX_CACHE_DIR, retention_days=FIX_CACHE_RETENTION_DAYS):
+        self.directory = directory
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        os.makedirs(directory, exist_ok=True)
+        self.purge()
+
+    @staticmethod
+    def make_key(language, message):
+        payload = f"{language_key(language)}\0{message}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, language, signature):
+        _, message = split_signature(signature)
+        try:
+            with open(self._path(self.make_key(language, message)), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, key, entry):
+        tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(key))
+
+    def store(self, language, signatures, old_code, new_code, stderr=''):
+        """
+        Enregistre, pour chaque signature que old_code -> new_code a fait disparaître, la
+        directive ajoutée qui la corrige : celle que g++ suggérait pour cette erreur
+        (include_hints sur `stderr`, la sortie d'avant la correction), ou la seule
+        directive ajoutée. Une erreur qu'on ne peut pas attribuer n'est pas gardée.
+        """
+        directives = added_directives(old_code, new_code, language)
+        if not directives:
+            return
+        # Comparaison sans espaces : "#include<vector>" est la directive suggérée "#include <vector>"
+        by_text = {''.join(directive.split()): directive for directive in directives}
+        hints = include_hints(stderr)
+        stored = 0
+        for signature in signatures:
+            hint = ''.join(hints.get(signature, '').split())
+            if hint in by_text:
+                fix = [by_text[hint]]
+            elif len(directives) == 1:
+                fix = directives
+            else:
+                continue
+            _, message = split_signature(signature)
+            self._write(self.make_key(language, message), {
+                'signature': message,
+                'language': language_key(language),
+                'directives': fix,
+                'updated_at': time.time()
+            })
+            stored += 1
+        with self._lock:
+            self.stores += stored
+
+    def apply(self, code, signatures, language):
+        """
+        Code avec les directives connues pour `signatures`, ou None s'il n'y a rien à ajouter.
+        """
+        patched = code
+        for signature in signatures:
+            entry = self.get(language, signature)
+            if entry is None or not entry.get('directives'):
+                continue
+            filename, _ = split_signature(signature)
+            result = insert_directives(patched, entry['directives'], filename)
+            if result is not None:
+                patched = result
+
+        with self._lock:
+            if patched != code:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return patched if patched != code else None
+
+    def purge(self):
+        limit = time.time() - self.retention_days * 86400
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < limit:
+                    os.remove(path)
+            except OSError:
+                continue
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'stores': self.stores}
+
+
+fix_cache = FixCache() if os.getenv('FIX_CACHE', '1') != '0' else None
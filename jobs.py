@@ -0,0 +1,316 @@
+import contextvars
+import math
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Nombre maximum de jobs gardés en mémoire (les plus anciens terminés sont oubliés)
+MAX_JOBS = 200
+
+# Nombre de pipelines exécutés en parallèle et places d'attente au-delà
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', '2'))
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '8'))
+
+# Durée supposée d'un pipeline tant qu'aucun n'a encore terminé (secondes)
+DEFAULT_PIPELINE_SECONDS = 120
+
+# Job en cours d'exécution dans le contexte courant (utilisé par les callbacks LLM)
+current_job = contextvars.ContextVar('current_job', default=None)
+
+
+class Job:
+    """
+    Une exécution du pipeline de génération.
+    `results` garde exactement la forme renvoyée auparavant par /generate.
+    """
+
+    def __init__(self, topic, language, job_id=None):
+        # Un job repris garde l'identifiant (et les checkpoints) du job d'origine
+        self.id = job_id or uuid.uuid4().hex
+        self.topic = topic
+        self.language = language
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.results = {
+            'status': 'queued',
+            'current_step': None,
+            'data': {}
+        }
+        self.events = []
+        self._events_cond = threading.Condition()
+        # Détail des temps (nom -> nombre, secondes) et consommation LLM / recherche
+        self.timings = {}
+        self.usage = {
+            'llm_calls': 0,
+            'llm_cache_hits': 0,
+            'llm_shared_calls': 0,
+            'input_tokens': 0,
+            'output_tokens': 0,
+            'search_calls': 0,
+            'search_cache_hits': 0
+        }
+        self._usage_lock = threading.Lock()
+
+    def add_timing(self, name, seconds):
+        with self._usage_lock:
+            timing = self.timings.setdefault(name, {'count': 0, 'seconds': 0.0})
+            timing['count'] += 1
+            timing['seconds'] += seconds
+
+    def add_usage(self, **counts):
+        with self._usage_lock:
+            for name, value in counts.items():
+                self.usage[name] = self.usage.get(name, 0) + value
+
+    def timing_breakdown(self):
+        """
+        Répartition du temps du job : total, par étape et par opération, plus la consommation.
+        """
+        with self._usage_lock:
+            timings = {name: dict(timing) for name, timing in self.timings.items()}
+            usage = dict(self.usage)
+        end = self.finished_at or time.time()
+        return {
+            'queued_seconds': (self.started_at or end) - self.created_at,
+            'total_seconds': end - self.started_at if self.started_at else 0.0,
+            'operations': timings,
+            'usage': usage
+        }
+
+    def emit(self, event, **data):
+        """
+        Ajoute un événement au journal du job et réveille les lecteurs SSE.
+        """
+        with self._events_cond:
+            self._append(event, data)
+
+    def _append(self, event, data):
+        # Appelée avec _events_cond déjà pris
+        self.events.append({
+            'id': len(self.events) + 1,
+            'event': event,
+            'time': time.time(),
+            'data': data
+        })
+        self._events_cond.notify_all()
+
+    def finish(self, status):
+        """
+        Pose le statut final et publie job_end en une seule fois : un lecteur qui voit
+        le job terminé (wait_events, finished) a forcément déjà reçu job_end.
+        """
+        with self._events_cond:
+            self.results['status'] = status
+            self._append('job_end', {
+                'status': status,
+                'error': self.error,
+                'duration': self.finished_at - self.started_at
+            })
+
+    def wait_events(self, after=0, timeout=15):
+        """
+        Renvoie les événements d'identifiant > `after`, en attendant au plus `timeout` secondes.
+        """
+        with self._events_cond:
+            if len(self.events) <= after and not self.finished:
+                self._events_cond.wait(timeout)
+            return self.events[after:]
+
+    @property
+    def finished(self):
+        return self.results['status'] in ('completed', 'error')
+
+    def snapshot(self):
+        """
+        Copie de l'état courant, lisible pendant que le worker continue d'écrire.
+        """
+        return {
+            'job_id': self.id,
+            'topic': self.topic,
+            'language': self.language,
+            'status': self.results['status'],
+            'current_step': self.results['current_step'],
+            'data': dict(self.results['data']),
+            'timings': self.timing_breakdown(),
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class JobConflictError(Exception):
+    """
+    Levée quand un job repris est encore en cours ou déjà terminé avec succès.
+    """
+
+
+class JobStore:
+    """
+    Registre des jobs en mémoire, partagé entre les requêtes HTTP.
+    """
+
+    def __init__(self, max_jobs=MAX_JOBS):
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, topic, language, job_id=None, start=None):
+        """
+        Enregistre un nouveau job et le lance avec `start(job)`, sous le verrou du registre.
+        Un job repris (`job_id` d'un job connu) ne remplace l'ancien que si celui-ci a échoué :
+        deux reprises simultanées ne peuvent pas démarrer toutes les deux.
+        Si `start` lève une exception (file pleine), le registre n'est pas modifié.
+        """
+        job = Job(topic, language, job_id)
+        with self._lock:
+            previous = self._jobs.get(job.id)
+            if previous is not None and not previous.finished:
+                raise JobConflictError("Job is still running")
+            if previous is not None and previous.results['status'] == 'completed':
+                raise JobConflictError("Job already completed")
+            if start is not None:
+                start(job)
+            self._jobs[job.id] = job
+            self._jobs.move_to_end(job.id)
+            self._evict()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _evict(self):
+        # Oublier les jobs terminés les plus anciens au-delà de la limite
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id].finished:
+                del self._jobs[job_id]
+
+
+def emit_event(event, **data):
+    """
+    Publie un événement sur le job courant, sans effet hors d'un job.
+    """
+    job = current_job.get()
+    if job is not None:
+        job.emit(event, **data)
+
+
+def run_job(job, pipeline):
+    """
+    Exécute `pipeline(topic, language, results)` pour le job et enregistre l'issue.
+    """
+    token = current_job.set(job)
+    job.started_at = time.time()
+    job.results['status'] = 'processing'
+    job.emit('job_start', topic=job.topic, language=job.language)
+    status = 'error'
+    try:
+        pipeline(job.topic, job.language, job.results)
+        status = 'completed'
+    except Exception as e:
+        traceback.print_exc()
+        job.error = str(e)
+    finally:
+        job.finished_at = time.time()
+        job.results['timings'] = job.timing_breakdown()
+        # Le statut final en dernier : un job "completed" a déjà tous ses résultats
+        job.finish(status)
+        current_job.reset(token)
+
+
+class QueueFullError(Exception):
+    """
+    Levée quand la file d'attente des pipelines est pleine.
+    """
+
+    def __init__(self, retry_after):
+        super().__init__("La file d'attente des pipelines est pleine")
+        self.retry_after = retry_after
+
+
+class JobPool:
+    """
+    Pool de threads borné pour les pipelines : au plus `workers` jobs en cours
+    et `queue_size` jobs en attente ; au-delà, `submit` refuse le job.
+    """
+
+    def __init__(self, workers=PIPELINE_WORKERS, queue_size=PIPELINE_QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pipeline')
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self._durations = deque(maxlen=50)
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def submit(self, job, pipeline):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise QueueFullError(self.retry_after())
+        with self._lock:
+            self.queued += 1
+        self._executor.submit(self._run, job, pipeline)
+
+    def _run(self, job, pipeline):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            run_job(job, pipeline)
+        finally:
+            with self._lock:
+                self.running -= 1
+                if job.results['status'] == 'error':
+                    self.failed += 1
+                else:
+                    self.completed += 1
+                if job.started_at and job.finished_at:
+                    self._durations.append(job.finished_at - job.started_at)
+            self._slots.release()
+
+    def average_duration(self):
+        with self._lock:
+            if not self._durations:
+                return DEFAULT_PIPELINE_SECONDS
+            return sum(self._durations) / len(self._durations)
+
+    def retry_after(self):
+        """
+        Estimation (secondes) du temps avant qu'une place se libère.
+        """
+        with self._lock:
+            waiting = self.queued
+        return max(1, math.ceil(self.average_duration() * (waiting + 1) / self.workers))
+
+    def stats(self):
+        average = self.average_duration()
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'queued': self.queued,
+                'running': self.running,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'average_duration': average
+            }
+
+
+job_store = JobStore()
+job_pool = JobPool()
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+from callbacks import mark_generations
+
+
+# Configuration du cache des réponses LLM
+LLM_CACHE_DIR = os.getenv('LLM_CACHE_DIR', os.path.join('.cache', 'llm'))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv('LLM_CACHE_MEMORY_ENTRIES', '256'))
+LLM_CACHE_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', str(200 * 1024 * 1024)))
+
+
+class TieredLLMCache(BaseCache):
+    """
+    Cache des réponses LLM à deux niveaux : LRU en mémoire puis fichiers sur disque.
+
+    La clé est le hash du `llm_string` (modèle, température, paramètres) et du
+    prompt complet, qui contient déjà le rôle et la backstory de l'agent ainsi
+    que la description de la tâche. Le disque est limité en taille : les entrées
+    les moins récemment utilisées sont supprimées en premier.
+    """
+
+    def __init__(self, directory=LLM_CACHE_DIR, memory_entries=LLM_CACHE_MEMORY_ENTRIES,
+                 max_bytes=LLM_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._disk_bytes = sum(size for _, _, size in self._disk_entries())
+
+    @staticmethod
+    def make_key(prompt, llm_string):
+        return hashlib.sha256(f"{llm_string}\0{prompt}".encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def lookup(self, prompt, llm_string):
+        key = self.make_key(prompt, llm_string)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return mark_generations(self._memory[key], 'cache')
+
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                generations = [loads(g) for g in json.load(f)]
+            # Marquer l'entrée comme récemment utilisée pour l'éviction
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(key, generations)
+        # Marquées pour que les callbacks ne les comptent pas comme des appels au fournisseur
+        return mark_generations(generations, 'cache')
+
+    def update(self, prompt, llm_string, return_val):
+        key = self.make_key(prompt, llm_string)
+        with self._lock:
+            self._remember(key, return_val)
+
+        path = self._path(key)
+        payload = json.dumps([dumps(g) for g in return_val], ensure_ascii=False)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(payload)
+
+        with self._lock:
+            # Une clé déjà présente est réécrite : seule la différence de taille compte
+            try:
+                previous = os.path.getsize(path)
+            except OSError:
+                previous = 0
+            os.replace(tmp_path, path)
+            self._disk_bytes += os.path.getsize(path) - previous
+            over_limit = self._disk_bytes > self.max_bytes
+        if over_limit:
+            self._evict_disk()
+
+    def clear(self, **kwargs):
+        with self._lock:
+            self._memory.clear()
+            for path, _, _ in self._disk_entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._disk_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'memory_entries': len(self._memory),
+                'disk_bytes': self._disk_bytes,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses
+            }
+
+    def _remember(self, key, generations):
+        self._memory[key] = generations
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_entries(self):
+        """
+        (chemin, date de dernier accès, taille) de chaque entrée sur disque.
+        """
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _evict_disk(self):
+        # Supprimer les entrées les plus anciennes jusqu'à 90 % de la limite
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        target = int(self.max_bytes * 0.9)
+        for path, _, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_bytes = total
@@ -0,0 +1,162 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from jobs import current_job
+
+
+# Bornes des histogrammes de durée (secondes) : de l'appel rapide au pipeline complet
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series['counts']):
+                    labels = _format_labels(self.labelnames, key, [('le', bound)])
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labelnames, key, [('le', '+Inf')])
+                lines.append(f"{self.name}_bucket{labels} {series['count']}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {series['sum']}")
+                lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+class Registry:
+    """
+    Registre minimal de métriques, exporté au format texte de Prometheus.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    'pipeline_stage_seconds', "Durée des étapes du pipeline", ('stage',)))
+STAGE_ERRORS = registry.register(Counter(
+    'pipeline_stage_errors_total', "Etapes du pipeline terminées en erreur", ('stage',)))
+PIPELINE_SECONDS = registry.register(Histogram(
+    'pipeline_seconds', "Durée totale du pipeline d'un job"))
+COMPILE_SECONDS = registry.register(Histogram(
+    'code_execution_seconds', "Compilation et exécution du code généré", ('language', 'phase')))
+DOCUMENTATION_SECONDS = registry.register(Histogram(
+    'documentation_seconds', "Génération de la documentation (LLM + PDF)"))
+PDF_SECONDS = registry.register(Histogram(
+    'pdf_render_seconds', "Création du PDF de documentation"))
+LLM_CALLS = registry.register(Counter(
+    'llm_calls_total', "Réponses LLM par source (network, shared, cache)", ('status', 'source')))
+LLM_SECONDS = registry.register(Histogram(
+    'llm_call_seconds', "Durée des appels au LLM"))
+LLM_TOKENS = registry.register(Counter(
+    'llm_tokens_total', "Tokens envoyés (input) et reçus (output)", ('direction',)))
+SEARCH_CALLS = registry.register(Counter(
+    'web_search_calls_total', "Recherches web par source (network, shared, cache)", ('source',)))
+SEARCH_SECONDS = registry.register(Histogram(
+    'web_search_seconds', "Durée des recherches web envoyées à Serper"))
+POOL = registry.register(Gauge(
+    'pipeline_pool', "Occupation du pool de pipelines", ('state',)))
+
+
+def record_job_timing(name, seconds):
+    job = current_job.get()
+    if job is not None:
+        job.add_timing(name, seconds)
+
+
+def record_job_usage(**counts):
+    job = current_job.get()
+    if job is not None:
+        job.add_usage(**counts)
+
+
+@contextmanager
+def timed(histogram, timing_name=None, **labels):
+    """
+    Mesure la durée du bloc dans `histogram` et dans le détail des temps du job courant.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        histogram.observe(duration, **labels)
+        record_job_timing(timing_name or histogram.name, duration)
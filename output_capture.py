@@ -0,0 +1,182 @@
+import os
+import tempfile
+import time
+import uuid
+from collections import deque
+
+
+# Mémoire gardée par flux : le début et la fin de la sortie (octets)
+OUTPUT_HEAD_BYTES = int(os.getenv('OUTPUT_HEAD_BYTES', str(64 * 1024)))
+OUTPUT_TAIL_BYTES = int(os.getenv('OUTPUT_TAIL_BYTES', str(64 * 1024)))
+# Une ligne plus longue est coupée (programme qui écrit sans retour à la ligne)
+OUTPUT_MAX_LINE_BYTES = int(os.getenv('OUTPUT_MAX_LINE_BYTES', str(16 * 1024)))
+# Au-delà du début, la sortie complète part sur disque, dans la limite de OUTPUT_SPILL_MAX_BYTES
+OUTPUT_SPILL_DIR = os.getenv('OUTPUT_SPILL_DIR', os.path.join(tempfile.gettempdir(), 'crewai-outputs'))
+OUTPUT_SPILL_MAX_BYTES = int(os.getenv('OUTPUT_SPILL_MAX_BYTES', str(50 * 1024 * 1024)))
+OUTPUT_SPILL_RETENTION_SECONDS = int(os.getenv('OUTPUT_SPILL_RETENTION_SECONDS', '3600'))
+
+
+def new_spill_path(name, directory=OUTPUT_SPILL_DIR):
+    os.makedirs(directory, exist_ok=True)
+    purge_spill_files(directory)
+    return os.path.join(directory, f"{uuid.uuid4().hex}-{name}.log")
+
+
+def purge_spill_files(directory=OUTPUT_SPILL_DIR, max_age=OUTPUT_SPILL_RETENTION_SECONDS):
+    limit = time.time() - max_age
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < limit:
+                os.remove(path)
+        except OSError:
+            continue
+
+
+class OutputCapture:
+    """
+    Capture bornée d'un flux de sortie, découpé en lignes.
+
+    Garde les premières lignes (jusqu'à `head_bytes`) et un tampon circulaire des
+    dernières (`tail_bytes`) ; les lignes du milieu sont comptées puis oubliées,
+    remplacées par un marqueur de troncature. Dès le premier dépassement, toute
+    la sortie est écrite dans un fichier (`spill_name`) pour pouvoir la consulter.
+    La mémoire utilisée ne dépend donc pas de ce qu'écrit le programme.
+    """
+
+    def __init__(self, head_bytes=OUTPUT_HEAD_BYTES, tail_bytes=OUTPUT_TAIL_BYTES,
+                 max_line_bytes=OUTPUT_MAX_LINE_BYTES, spill_name=None,
+                 spill_max_bytes=OUTPUT_SPILL_MAX_BYTES):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.max_line_bytes = max_line_bytes
+        self.spill_name = spill_name
+        self.spill_max_bytes = spill_max_bytes
+
+        self._head = []
+        self._head_size = 0
+        self._head_full = False
+        self._tail = deque()
+        self._tail_size = 0
+        self._partial = b''
+
+        self.lines = 0
+        self.bytes = 0
+        self.dropped_lines = 0
+        self.dropped_bytes = 0
+
+        self.spill_path = None
+        self._spill = None
+        self.spilled_bytes = 0
+        self.spill_truncated = False
+
+        self._started = None
+        self._finished = None
+        self._window_start = None
+        self._window_lines = 0
+        self.peak_lines_per_second = 0.0
+
+    def feed(self, data):
+        now = time.monotonic()
+        if self._started is None:
+            self._started = self._window_start = now
+        self.bytes += len(data)
+
+        data = self._partial + data
+        *complete, self._partial = data.split(b'\n')
+        for line in complete:
+            self._add_line(line)
+        while len(self._partial) > self.max_line_bytes:
+            self._add_line(self._partial[:self.max_line_bytes])
+            self._partial = self._partial[self.max_line_bytes:]
+
+        self._window_lines += len(complete)
+        if now - self._window_start >= 1.0:
+            self._close_window(now)
+
+    def _close_window(self, now):
+        elapsed = now - self._window_start
+        if elapsed > 0:
+            self.peak_lines_per_second = max(self.peak_lines_per_second, self._window_lines / elapsed)
+        self._window_start = now
+        self._window_lines = 0
+
+    def _add_line(self, raw):
+        self.lines += 1
+        size = len(raw) + 1
+        line = raw.decode('utf-8', errors='replace').strip()
+
+        if not self._head_full and self._head_size + size <= self.head_bytes:
+            self._head.append(line)
+            self._head_size += size
+            return
+        if not self._head_full:
+            self._head_full = True
+            self._open_spill()
+        self._write_spill(line)
+
+        self._tail.append((line, size))
+        self._tail_size += size
+        while self._tail_size > self.tail_bytes and len(self._tail) > 1:
+            _, dropped = self._tail.popleft()
+            self._tail_size -= dropped
+            self.dropped_lines += 1
+            self.dropped_bytes += dropped
+
+    def _open_spill(self):
+        if self.spill_name is None:
+            return
+        try:
+            self.spill_path = new_spill_path(self.spill_name)
+            self._spill = open(self.spill_path, 'w', encoding='utf-8', errors='replace')
+        except OSError:
+            self.spill_path = None
+            return
+        # Le fichier reprend la sortie depuis le début
+        for line in self._head:
+            self._write_spill(line)
+
+    def _write_spill(self, line):
+        if self._spill is None:
+            return
+        if self.spilled_bytes + len(line) + 1 > self.spill_max_bytes:
+            self.spill_truncated = True
+            self._spill.close()
+            self._spill = None
+            return
+        self._spill.write(line + '\n')
+        self.spilled_bytes += len(line) + 1
+
+    def close(self):
+        if self._partial:
+            self._add_line(self._partial)
+            self._partial = b''
+        self._finished = time.monotonic()
+        if self._window_start is not None:
+            self._close_window(self._finished)
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def text(self):
+        lines = list(self._head)
+        if self.dropped_lines:
+            marker = f"... [{self.dropped_lines} lignes ({self.dropped_bytes} octets) tronquées"
+            if self.spill_path:
+                marker += f", sortie complète : {self.spill_path}"
+            lines.append(marker + "] ...")
+        lines.extend(line for line, _ in self._tail)
+        return "\n".join(lines).strip()
+
+    def stats(self):
+        elapsed = (self._finished or time.monotonic()) - self._started if self._started else 0.0
+        return {
+            'lines': self.lines,
+            'bytes': self.bytes,
+            'dropped_lines': self.dropped_lines,
+            'dropped_bytes': self.dropped_bytes,
+            'lines_per_second': self.lines / elapsed if elapsed > 0 else float(self.lines),
+            'peak_lines_per_second': max(self.peak_lines_per_second, self._window_lines),
+            'spill_file': self.spill_path,
+            'spill_truncated': self.spill_truncated
+        }
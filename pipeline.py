@@ -0,0 +1,185 @@
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+
+
+# Cache des sorties d'étapes, indexé par le hash des entrées (désactivable avec STAGE_CACHE=0)
+STAGE_CACHE_DIR = os.getenv('STAGE_CACHE_DIR', os.path.join('.cache', 'stages'))
+STAGE_CACHE_RETENTION_DAYS = float(os.getenv('STAGE_CACHE_RETENTION_DAYS', '7'))
+# A incrémenter quand la logique des étapes change (modèle et prompts font partie de la clé)
+STAGE_CACHE_VERSION = '1'
+PIPELINE_MAX_WORKERS = int(os.getenv('PIPELINE_STAGE_WORKERS', '4'))
+
+
+class PipelineError(Exception):
+    pass
+
+
+class Stage:
+    """
+    Etape du pipeline : `func(**entrées)` renvoie un dict contenant chacune des `outputs`.
+    Une étape démarre dès que toutes ses entrées sont disponibles.
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), agent=None, cacheable=False, fingerprint=None):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.agent = agent
+        # Seules les étapes sans effet de bord (appels LLM) peuvent être rejouées depuis le cache
+        self.cacheable = cacheable
+        # `fingerprint(**entrées)` : ce qui détermine aussi la sortie (modèle, température, prompts)
+        self.fingerprint = fingerprint
+
+    def __repr__(self):
+        return f"Stage({self.name!r})"
+
+
+class StageCache:
+    """
+    Sorties d'étapes sur disque, une entrée JSON par hash (étape + entrées + empreinte de l'étape).
+    """
+
+    def __init__(self, directory=STAGE_CACHE_DIR, retention_days=STAGE_CACHE_RETENTION_DAYS):
+        self.directory = directory
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.purge()
+
+    @staticmethod
+    def make_key(stage, inputs):
+        payload = json.dumps({
+            'stage': stage.name,
+            'version': STAGE_CACHE_VERSION,
+            'inputs': inputs,
+            'fingerprint': stage.fingerprint(**inputs) if stage.fingerprint else None
+        }, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key, outputs):
+        try:
+            payload = json.dumps(outputs, ensure_ascii=False)
+        except (TypeError, ValueError):
+            # Sortie non sérialisable : on ne la garde pas
+            return
+        tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        os.replace(tmp_path, self._path(key))
+
+
+    def purge(self):
+        limit = time.time() - self.retention_days * 86400
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < limit:
+                    os.remove(path)
+            except OSError:
+                continue
+
+
+def has_error(value):
+    """
+    Vrai si une sortie contient un résultat en erreur ({'status': 'error', ...}), même imbriqué.
+    """
+    if isinstance(value, dict):
+        return value.get('status') == 'error' or any(has_error(item) for item in value.values())
+    return False
+
+
+class Pipeline:
+    """
+    Exécute un graphe d'étapes déclarées par leurs entrées et sorties.
+
+    Les étapes indépendantes tournent en parallèle, une étape dont toutes les
+    sorties sont déjà connues (valeurs initiales) est sautée, et les étapes
+    `cacheable` réutilisent leur sortie si leurs entrées n'ont pas changé.
+    """
+
+    def __init__(self, stages, cache=None, max_workers=PIPELINE_MAX_WORKERS):
+        self.stages = list(stages)
+        self.cache = cache
+        self.max_workers = max_workers
+        producers = {}
+        for stage in self.stages:
+            for output in stage.outputs:
+                if output in producers:
+                    raise PipelineError(f"'{output}' est produit par {producers[output]} et {stage}")
+                producers[output] = stage
+
+    def run(self, initial, stage_context=None, on_output=None):
+        """
+        Lance le graphe à partir des valeurs `initial` et renvoie toutes les valeurs.
+
+        `stage_context(stage, cached)` fournit un gestionnaire de contexte autour de
+        chaque étape ; `on_output(stage, outputs)` est appelé dans ce contexte
+        dès que l'étape a produit ses sorties.
+        """
+        values = dict(initial)
+        pending = [stage for stage in self.stages
+                   if not all(output in values for output in stage.outputs)]
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='stage') as executor:
+            while pending or running:
+                for stage in [s for s in pending if all(name in values for name in s.inputs)]:
+                    pending.remove(stage)
+                    inputs = {name: values[name] for name in stage.inputs}
+                    # Chaque étape hérite du contexte courant (job, span de trace)
+                    context = contextvars.copy_context()
+                    future = executor.submit(context.run, self._run_stage,
+                                             stage, inputs, stage_context, on_output)
+                    running[future] = stage
+
+                if not running:
+                    missing = sorted({name for stage in pending for name in stage.inputs if name not in values})
+                    raise PipelineError(f"Entrées jamais produites : {', '.join(missing)}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    running.pop(future)
+                    # Une erreur arrête le pipeline : plus aucune étape n'est lancée
+                    values.update(future.result())
+
+        return values
+
+    def _run_stage(self, stage, inputs, stage_context, on_output):
+        key = None
+        cached = None
+        if stage.cacheable and self.cache is not None:
+            key = StageCache.make_key(stage, inputs)
+            cached = self.cache.get(key)
+
+        with (stage_context(stage, cached is not None) if stage_context else nullcontext()):
+            if cached is not None:
+                outputs = cached
+            else:
+                outputs = stage.func(**inputs) or {}
+                missing = [name for name in stage.outputs if name not in outputs]
+                if missing:
+                    raise PipelineError(f"{stage} n'a pas produit : {', '.join(missing)}")
+                # Une erreur (LLM, PDF) peut être passagère : elle n'est pas mise en cache
+                if key is not None and not has_error(outputs):
+                    self.cache.set(key, {name: outputs[name] for name in stage.outputs})
+            outputs = {name: outputs[name] for name in stage.outputs}
+            if on_output:
+                on_output(stage, outputs)
+        return outputs
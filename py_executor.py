@@ -0,0 +1,154 @@
+"""
+Exécution du code Python généré dans des interpréteurs démarrés à l'avance.
+
+Chaque worker est un `python -I` déjà lancé qui attend sur stdin une ligne JSON
+(dossier du projet, fichier principal), exécute ce fichier avec runpy puis se
+termine : un worker ne sert qu'une fois, aucun état ne passe d'un programme à
+l'autre. Le pool en relance un dès qu'un worker est pris, si bien que le temps
+de démarrage de l'interpréteur est payé pendant l'attente et non pendant l'exécution.
+"""
+import atexit
+import json
+import os
+import subprocess
+import sys
+import threading
+from collections import deque
+
+from runner import POSIX, close_process, supervise
+from sandbox import limit_pairs
+
+
+# Workers prêts à l'avance et délai d'exécution par défaut (secondes)
+PY_POOL_SIZE = int(os.getenv('PY_POOL_SIZE', '2'))
+PY_RUN_TIMEOUT = float(os.getenv('PY_RUN_TIMEOUT', '30'))
+# Modules importés pendant le préchauffage
+PY_PRELOAD = os.getenv('PY_PRELOAD', 'json,re,collections,datetime,typing,dataclasses,random,math')
+
+# Code du worker : préchauffage, attente de la tâche, exécution du fichier principal
+BOOTSTRAP = r'''
+import importlib, json, os, runpy, sys
+for name in sys.argv[1].split(','):
+    try:
+        importlib.import_module(name)
+    except Exception:
+        pass
+job = json.loads(sys.stdin.readline())
+try:
+    import resource
+except ImportError:
+    resource = None
+# Limites de ressources (CPU, mémoire, fichiers, processus) posées avant le programme
+for name, (soft, hard) in job['limits'].items():
+    try:
+        resource.setrlimit(getattr(resource, name), (soft, hard))
+    except (AttributeError, ValueError, OSError):
+        pass
+os.chdir(job['cwd'])
+sys.path.insert(0, job['cwd'])
+sys.argv = [job['entry']]
+del importlib, json, os, name, resource
+try:
+    runpy.run_path(job['entry'], run_name='__main__')
+except SystemExit:
+    raise
+except BaseException as error:
+    # Traceback identique à `python entry` : sans les cadres du worker et de runpy
+    import traceback
+    tb = error.__traceback__
+    while tb is not None and tb.tb_frame.f_code.co_filename.startswith('<'):
+        tb = tb.tb_next
+    traceback.print_exception(type(error), error, tb)
+    sys.exit(1)
+'''
+
+
+class PythonExecutor:
+    """
+    Pool d'interpréteurs Python préchauffés, à usage unique.
+    """
+
+    def __init__(self, size=PY_POOL_SIZE, python=sys.executable, preload=PY_PRELOAD):
+        self.size = size
+        self.python = python
+        self.preload = preload
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self.warm_starts = 0
+        self.cold_starts = 0
+
+    def _spawn(self):
+        env = os.environ.copy()
+        env['PYTHONWARNINGS'] = 'ignore'
+        env['PYTHONUNBUFFERED'] = '1'
+        return subprocess.Popen(
+            # -I : ni variables PYTHON*, ni site utilisateur, ni dossier courant dans sys.path
+            [self.python, '-I', '-c', BOOTSTRAP, self.preload],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+            # Groupe de processus à part : un arrêt tue aussi les enfants du programme
+            start_new_session=POSIX
+        )
+
+    def warm_up(self):
+        """
+        Complète le pool jusqu'à `size` workers prêts.
+        """
+        with self._lock:
+            while len(self._idle) < self.size:
+                self._idle.append(self._spawn())
+
+    def _take(self):
+        with self._lock:
+            while self._idle:
+                process = self._idle.popleft()
+                if process.poll() is None:
+                    self.warm_starts += 1
+                    break
+            else:
+                self.cold_starts += 1
+                process = self._spawn()
+        # Remplacer le worker pris pendant que celui-ci s'exécute
+        self.warm_up()
+        return process
+
+    def run(self, project_dir, entry, timeout=PY_RUN_TIMEOUT):
+        """
+        Exécute `entry` (relatif à `project_dir`) comme `python entry` dans ce dossier,
+        avec les limites de ressources de sandbox.py.
+        Renvoie returncode, stdout, stderr (bornés, voir OutputCapture), leurs
+        statistiques, la consommation (resources), timed_out et duration.
+        """
+        process = self._take()
+        job = json.dumps({'cwd': os.path.abspath(project_dir), 'entry': entry, 'limits': limit_pairs()})
+        try:
+            process.stdin.write(job.encode('utf-8') + b'\n')
+            process.stdin.flush()
+        except OSError:
+            # Worker mort entre-temps : le lire quand même pour remonter son erreur
+            pass
+        # stdin reste ouvert sans données, comme avant : input() attend jusqu'au délai
+        return supervise(process, timeout)
+
+    def shutdown(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for process in idle:
+            process.kill()
+            process.wait()
+            close_process(process)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'idle': len(self._idle),
+                'warm_starts': self.warm_starts,
+                'cold_starts': self.cold_starts
+            }
+
+
+python_executor = PythonExecutor()
+atexit.register(python_executor.shutdown)
@@ -0,0 +1,145 @@
+"""
+Exécution surveillée des programmes générés : sorties bornées, délai maximum,
+limites de ressources et mesure de la consommation.
+
+Utilisé pour les workers Python préchauffés (py_executor.py) et pour les
+programmes compilés (C++, Java).
+"""
+import os
+import selectors
+import signal
+import subprocess
+import threading
+import time
+
+from output_capture import OutputCapture
+from sandbox import limit_pairs, limited_command, reap, usage_report, wait_with_usage
+
+
+POSIX = os.name == 'posix'
+
+
+def supervise(process, timeout):
+    """
+    Lit les sorties de `process` jusqu'à sa fin ou jusqu'au délai, puis l'arrête si besoin.
+    Renvoie returncode, stdout, stderr (bornés, voir OutputCapture), leurs
+    statistiques, la consommation (resources), timed_out et duration.
+    """
+    start = time.perf_counter()
+    stdout, stderr = OutputCapture(spill_name='stdout'), OutputCapture(spill_name='stderr')
+    deadline = time.monotonic() + timeout
+    if POSIX:
+        timed_out = collect_selector(process, stdout, stderr, deadline)
+    else:
+        timed_out = collect_threads(process, stdout, stderr, deadline)
+
+    usage = None
+    if not timed_out:
+        timed_out, usage = wait_with_usage(process, deadline)
+    if timed_out:
+        usage = stop_process(process)
+    close_process(process)
+    duration = time.perf_counter() - start
+    stdout.close()
+    stderr.close()
+    return {
+        'returncode': process.returncode,
+        'stdout': stdout.text(),
+        'stderr': stderr.text(),
+        'stdout_stats': stdout.stats(),
+        'stderr_stats': stderr.stats(),
+        'resources': usage_report(usage, duration, process.returncode, stderr.text()),
+        'timed_out': timed_out,
+        'duration': duration
+    }
+
+
+def run_command(args, cwd, timeout, limits=None):
+    """
+    Lance `args` dans `cwd` sous les limites de ressources (sandbox.run_limits() par défaut)
+    et le surveille avec `supervise`. L'entrée standard est vide.
+    """
+    process = subprocess.Popen(
+        # Limites posées par un lanceur qui exec ensuite le programme (pas de preexec_fn)
+        limited_command(args, limit_pairs(limits)),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        start_new_session=POSIX
+    )
+    return supervise(process, timeout)
+
+
+def collect_selector(process, stdout, stderr, deadline):
+    # Attente sur les deux pipes à la fois : réveil à chaque sortie ou à la fin, sans sondage
+    with selectors.DefaultSelector() as selector:
+        selector.register(process.stdout, selectors.EVENT_READ, stdout)
+        selector.register(process.stderr, selectors.EVENT_READ, stderr)
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            for key, _ in selector.select(remaining):
+                data = os.read(key.fd, 65536)
+                if data:
+                    key.data.feed(data)
+                else:
+                    selector.unregister(key.fileobj)
+    return False
+
+
+def collect_threads(process, stdout, stderr, deadline):
+    # Windows : select() ne gère pas les pipes, un thread de lecture par flux
+    def read(pipe, collector):
+        for chunk in iter(lambda: pipe.read1(65536), b''):
+            collector.feed(chunk)
+
+    readers = [threading.Thread(target=read, args=(process.stdout, stdout), daemon=True),
+               threading.Thread(target=read, args=(process.stderr, stderr), daemon=True)]
+    for reader in readers:
+        reader.start()
+    try:
+        process.wait(timeout=max(0.0, deadline - time.monotonic()))
+    except subprocess.TimeoutExpired:
+        return True
+    for reader in readers:
+        reader.join(timeout=1)
+    return False
+
+
+def stop_process(process):
+    """
+    Arrêt propre, puis forcé au bout de 5 secondes ; renvoie le rusage du processus.
+    """
+    if not POSIX:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        return None
+    try:
+        # Tout le groupe : les enfants du programme sont arrêtés aussi
+        os.killpg(process.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+    timed_out, usage = wait_with_usage(process, time.monotonic() + 5)
+    if timed_out:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        usage = reap(process)
+    return usage
+
+
+def close_process(process):
+    for pipe in (process.stdin, process.stdout, process.stderr):
+        if pipe is None:
+            continue
+        try:
+            pipe.close()
+        except OSError:
+            pass
@@ -0,0 +1,193 @@
+"""
+Limites de ressources et mesure de la consommation des programmes générés.
+
+Les limites (rlimits) sont posées dans le processus du programme avant son
+exécution ; la consommation (temps CPU, pic de mémoire, durée réelle) est lue
+avec os.wait4 au moment où le processus est récupéré. Sous Windows, le module
+`resource` n'existe pas : seules la durée et le délai maximum s'appliquent.
+"""
+import json
+import os
+import selectors
+import signal
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Limites par programme exécuté (0 = pas de limite)
+RUN_LIMIT_CPU_SECONDS = int(os.getenv('RUN_LIMIT_CPU_SECONDS', '20'))
+RUN_LIMIT_MEMORY_MB = int(os.getenv('RUN_LIMIT_MEMORY_MB', '1024'))
+RUN_LIMIT_OPEN_FILES = int(os.getenv('RUN_LIMIT_OPEN_FILES', '256'))
+# RLIMIT_NPROC compte tous les processus de l'utilisateur, pas seulement ceux du programme
+RUN_LIMIT_PROCESSES = int(os.getenv('RUN_LIMIT_PROCESSES', '512'))
+
+
+def run_limits():
+    """
+    {nom de la limite resource: valeur}, sans les limites désactivées.
+    """
+    limits = {
+        'RLIMIT_CPU': RUN_LIMIT_CPU_SECONDS,
+        'RLIMIT_AS': RUN_LIMIT_MEMORY_MB * 1024 * 1024,
+        'RLIMIT_NOFILE': RUN_LIMIT_OPEN_FILES,
+        'RLIMIT_NPROC': RUN_LIMIT_PROCESSES,
+    }
+    return {name: value for name, value in limits.items() if value > 0}
+
+
+def limit_pairs(limits=None):
+    """
+    {nom: (limite souple, limite dure)} à poser dans le processus du programme.
+    Une limite ne peut qu'être abaissée : la limite dure actuelle est gardée si elle est plus basse.
+    """
+    if resource is None:
+        return {}
+    pairs = {}
+    for name, value in (run_limits() if limits is None else limits).items():
+        which = getattr(resource, name, None)
+        if which is None:
+            continue
+        _, hard = resource.getrlimit(which)
+        # CPU : SIGXCPU à la limite souple, SIGKILL une seconde après
+        wanted_hard = value + 1 if name == 'RLIMIT_CPU' else value
+        if hard != resource.RLIM_INFINITY:
+            value, wanted_hard = min(value, hard), min(wanted_hard, hard)
+        pairs[name] = (value, wanted_hard)
+    return pairs
+
+
+# Lanceur des programmes compilés : pose les limites puis se remplace par le programme (exec).
+# Le processus reste le même (même pid, rusage compris), sans code Python exécuté entre
+# fork et exec dans le serveur, qui a des threads (preexec_fn n'y est pas sûr).
+LIMITS_LAUNCHER = r'''
+import json, os, resource, sys
+for name, (soft, hard) in json.loads(sys.argv[1]).items():
+    try:
+        resource.setrlimit(getattr(resource, name), (soft, hard))
+    except (AttributeError, ValueError, OSError):
+        pass
+os.execvp(sys.argv[2], sys.argv[2:])
+'''
+
+
+def limited_command(args, pairs=None):
+    """
+    Commande qui lance `args` sous les limites `pairs` (voir limit_pairs), via LIMITS_LAUNCHER.
+    Sans limites à poser (Windows, toutes désactivées), `args` est renvoyé tel quel.
+    """
+    pairs = limit_pairs() if pairs is None else pairs
+    if not pairs:
+        return list(args)
+    return [sys.executable, '-I', '-c', LIMITS_LAUNCHER, json.dumps(pairs), *args]
+
+
+def _exit_code(status):
+    if hasattr(os, 'waitstatus_to_exitcode'):
+        return os.waitstatus_to_exitcode(status)
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _pidfd_wait(process, deadline):
+    """
+    Linux : attend la fin du processus sur son pidfd, sans le récupérer.
+    Renvoie True (terminé), False (délai dépassé) ou None si pidfd n'est pas disponible.
+    """
+    if not hasattr(os, 'pidfd_open'):
+        return None
+    try:
+        pidfd = os.pidfd_open(process.pid)
+    except OSError:
+        return None
+    try:
+        with selectors.DefaultSelector() as selector:
+            selector.register(pidfd, selectors.EVENT_READ)
+            return bool(selector.select(max(0.0, deadline - time.monotonic())))
+    finally:
+        os.close(pidfd)
+
+
+def wait_with_usage(process, deadline):
+    """
+    Attend la fin de `process` (subprocess.Popen) jusqu'à `deadline` (time.monotonic).
+    Renvoie (délai dépassé, rusage ou None). Le code de retour est reporté dans process.returncode.
+    """
+    if os.name != 'posix':
+        try:
+            process.wait(timeout=max(0.0, deadline - time.monotonic()))
+        except Exception:
+            return True, None
+        return False, None
+    if process.returncode is not None:
+        return False, None
+
+    finished = _pidfd_wait(process, deadline)
+    if finished is not None:
+        return (False, reap(process)) if finished else (True, None)
+
+    # Repli sans pidfd (macOS...) : vérification périodique
+    while True:
+        pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            process.returncode = _exit_code(status)
+            return False, usage
+        if time.monotonic() >= deadline:
+            return True, None
+        time.sleep(0.01)
+
+
+def reap(process):
+    """
+    Récupère un processus terminé (ou tué) avec os.wait4 et renvoie son rusage.
+    """
+    if process.returncode is not None:
+        return None
+    try:
+        _, status, usage = os.wait4(process.pid, 0)
+    except ChildProcessError:
+        return None
+    process.returncode = _exit_code(status)
+    return usage
+
+
+def usage_report(usage, wall_seconds, returncode=None, stderr=''):
+    """
+    Consommation d'un programme, au format renvoyé au client.
+    """
+    report = {'wall_seconds': round(wall_seconds, 4)}
+    if usage is not None:
+        # ru_maxrss : kilo-octets sous Linux, octets sous macOS
+        peak_rss_kb = usage.ru_maxrss / 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+        report.update({
+            'cpu_user_seconds': round(usage.ru_utime, 4),
+            'cpu_system_seconds': round(usage.ru_stime, 4),
+            'peak_rss_mb': round(peak_rss_kb / 1024, 2)
+        })
+    limit = limit_exceeded(usage, returncode, stderr)
+    if limit:
+        report['limit_exceeded'] = limit
+    return report
+
+
+# Erreurs d'allocation quand la limite d'espace d'adressage est atteinte
+MEMORY_ERRORS = ('MemoryError', 'std::bad_alloc', 'java.lang.OutOfMemoryError')
+
+
+def limit_exceeded(usage, returncode, stderr=''):
+    if not returncode:
+        return None
+    if RUN_LIMIT_MEMORY_MB and any(error in stderr[-2000:] for error in MEMORY_ERRORS):
+        return 'memory'
+    if returncode > 0:
+        return None
+    cpu = usage.ru_utime + usage.ru_stime if usage is not None else 0
+    if returncode == -getattr(signal, 'SIGXCPU', -1) or (
+            RUN_LIMIT_CPU_SECONDS and returncode == -signal.SIGKILL and cpu >= RUN_LIMIT_CPU_SECONDS):
+        return 'cpu'
+    return None
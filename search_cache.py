@@ -0,0 +1,86 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# Configuration du cache des recherches web
+SEARCH_CACHE_PATH = os.getenv('SEARCH_CACHE_PATH', os.path.join('.cache', 'search.sqlite3'))
+SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', str(7 * 24 * 3600)))
+
+
+def normalize_query(query):
+    """
+    Minuscules et espaces normalisés : "Best  practices " == "best practices".
+    """
+    return " ".join(query.lower().split())
+
+
+class SearchCache:
+    """
+    Cache SQLite des résultats de recherche, avec durée de vie (TTL)
+    et compteurs de succès/échecs. Survit aux redémarrages du serveur.
+    """
+
+    def __init__(self, path=SEARCH_CACHE_PATH, ttl=SEARCH_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_results ("
+                " key TEXT PRIMARY KEY,"
+                " result TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def make_key(query, num_results, gl, hl):
+        return json.dumps([normalize_query(query), int(num_results), gl.lower(), hl.lower()])
+
+    def get(self, query, num_results, gl, hl):
+        key = self.make_key(query, num_results, gl, hl)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, created_at FROM search_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and time.time() - row[1] <= self.ttl:
+                self.hits += 1
+                return row[0]
+            if row is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM search_results WHERE key = ?", (key,))
+            self.misses += 1
+            return None
+
+    def set(self, query, num_results, gl, hl, result):
+        key = self.make_key(query, num_results, gl, hl)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_results (key, result, created_at) VALUES (?, ?, ?)",
+                (key, result, time.time())
+            )
+
+    def purge_expired(self):
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM search_results WHERE created_at < ?", (time.time() - self.ttl,)
+            )
+            return cursor.rowcount
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM search_results").fetchone()[0]
+            return {
+                'entries': entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'ttl': self.ttl
+            }
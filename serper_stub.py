@@ -0,0 +1,117 @@
+"""
+Serveur HTTP local qui imite https://google.serper.dev/search.
+
+Il répond au même format que Serper (JSON avec un tableau `organic`) avec une
+latence, un taux d'erreur et une taille de réponse configurables. Permet de
+tester et mesurer WebSearchTool sans réseau ni clé d'API :
+
+    python serper_stub.py --port 8765 --latency 0.08 --error-rate 0.02
+    SERPER_URL=http://127.0.0.1:8765/search python app.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubConfig:
+    def __init__(self, latency=0.05, jitter=0.0, error_rate=0.0, error_status=500,
+                 results=10, snippet_bytes=160):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.results = results
+        self.snippet_bytes = snippet_bytes
+
+
+def build_response(query, num, config):
+    count = min(num, config.results) if num else config.results
+    snippet = ("lorem ipsum " * (config.snippet_bytes // 12 + 1))[:config.snippet_bytes]
+    return {
+        "searchParameters": {"q": query, "num": num, "type": "search"},
+        "organic": [
+            {
+                "title": f"{query} - résultat {position}",
+                "link": f"https://example.com/{position}",
+                "snippet": snippet,
+                "position": position
+            }
+            for position in range(1, count + 1)
+        ]
+    }
+
+
+class SerperStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, comme le vrai service
+
+    def do_POST(self):
+        config = self.server.config
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send(400, {"message": "Invalid JSON"})
+            return
+
+        delay = config.latency + random.uniform(-config.jitter, config.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        if random.random() < config.error_rate:
+            self._send(config.error_status, {"message": "Simulated error"})
+            return
+
+        self._send(200, build_response(body.get("q", ""), int(body.get("num", 10)), config))
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(config=None, host='127.0.0.1', port=0):
+    """
+    Démarre le serveur dans un thread. Renvoie (serveur, url de recherche).
+    """
+    server = ThreadingHTTPServer((host, port), SerperStubHandler)
+    server.daemon_threads = True
+    server.config = config or StubConfig()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/search"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur local imitant l'API Serper")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.05, help="latence moyenne (s)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="variation de latence (s)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="proportion de réponses en erreur")
+    parser.add_argument('--error-status', type=int, default=500)
+    parser.add_argument('--results', type=int, default=10, help="nombre de résultats organiques")
+    parser.add_argument('--snippet-bytes', type=int, default=160, help="taille de chaque extrait")
+    args = parser.parse_args()
+
+    config = StubConfig(args.latency, args.jitter, args.error_rate, args.error_status,
+                        args.results, args.snippet_bytes)
+    server = ThreadingHTTPServer((args.host, args.port), SerperStubHandler)
+    server.config = config
+    print(f"Serveur Serper local sur http://{args.host}:{args.port}/search")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
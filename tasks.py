@@ -188,7 +188,7 @@ class TaskPlanning(Task):
 
 class CodeGenerationTask(Task):
     @staticmethod
-    def code_generation(application, language, planing_summary):
+    def code_generation(application, language, planing_summary, agent=None):
         global requirements_summary
         if isinstance(planing_summary, dict):
             requirements_summary = "\n".join(
@@ -256,7 +256,7 @@ class CodeGenerationTask(Task):
                 "- For Python: # filename.py\n"
                 "- For Java: // filename.java or ** filename.java **"
             ),
-            agent=code_generator_agent
+            agent=agent or code_generator_agent
         )
 
 
@@ -339,7 +339,7 @@ class CodeFixTask(Task):
 
 class TestValidationTask(Task):
     @staticmethod
-    def validate_code(language, application, generated_code):
+    def validate_code(language, application, generated_code, execution_result=None):
         # Vérification des paramètres
         if not language:
             language = "python"  # ou une autre valeur par défaut
@@ -361,11 +361,20 @@ class TestValidationTask(Task):
             test_tool = "appropriate testing framework"
             quality_guidelines = "standard practices for the language"
 
+        # Résultat réel de la compilation et de l'exécution dans le bac à sable
+        execution_section = ""
+        if execution_result:
+            execution_section = (
+                f"Actual build and run result (sandboxed execution):\n{execution_result}\n\n"
+                "Base the test summary on this real result; do not claim a behaviour it contradicts.\n\n"
+            )
+
         return Task(
             description=(
                 f"Test Validation Task for {application} Development in {language}\n\n"
                 f"Objective: Validate the generated {language} code using {test_tool}.\n\n"
                 f"Code to validate:\n{generated_code}\n\n"
+                f"{execution_section}"
                 "Tasks to perform:\n"
                 f"- Write and run test cases using {test_tool}.\n"
                 "- Check that all required functionalities work correctly.\n"
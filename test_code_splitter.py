@@ -0,0 +1,64 @@
+import unittest
+
+from code_splitter import split_code
+
+
+def files(code, language='cpp'):
+    return {block['filename']: block['content'] for block in split_code(code, language)}
+
+
+class SplitCodeTest(unittest.TestCase):
+
+    def test_headers_without_fences(self):
+        code = "// task.h\nint f();\n// main.cpp\nint main() { return 0; }\n"
+        self.assertEqual(files(code), {
+            'task.h': "int f();\n",
+            'main.cpp': "int main() { return 0; }\n",
+        })
+
+    def test_prose_between_and_after_fenced_blocks_is_dropped(self):
+        code = (
+            "Voici le projet.\n"
+            "// task.h\n"
+            "```cpp\n"
+            "int f();\n"
+            "```\n"
+            "The header above declares f, implemented below.\n"
+            "// main.cpp\n"
+            "```cpp\n"
+            "int f() { return 1; }\n"
+            "int main() { return f(); }\n"
+            "```\n"
+            "Explanation text\n"
+        )
+        self.assertEqual(files(code), {
+            'task.h': "int f();\n",
+            'main.cpp': "int f() { return 1; }\nint main() { return f(); }\n",
+        })
+
+    def test_headers_inside_one_fenced_block(self):
+        code = (
+            "```cpp\n"
+            "// task.h\n"
+            "int f();\n"
+            "// main.cpp\n"
+            "int main() { return 0; }\n"
+            "```\n"
+            "Explanation text\n"
+        )
+        self.assertEqual(files(code), {
+            'task.h': "int f();\n",
+            'main.cpp': "int main() { return 0; }\n",
+        })
+
+    def test_unclosed_fence_keeps_the_rest(self):
+        code = "// main.py\n```python\nprint('ok')\n"
+        self.assertEqual(files(code, 'python'), {'main.py': "print('ok')\n"})
+
+    def test_default_file_keeps_only_fenced_code(self):
+        code = "Intro\n```java\nclass Main {}\n```\nExplanation text\n"
+        self.assertEqual(files(code, 'java'), {'Main.java': "class Main {}\n"})
+
+
+if __name__ == '__main__':
+    unittest.main()
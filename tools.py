@@ -2,9 +2,21 @@
 
 from dotenv import load_dotenv
 load_dotenv()
+import os
+import asyncio
+import random
+import threading
 import traceback
+import weakref
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from fpdf import FPDF
+from search_cache import SearchCache
+from singleflight import SingleFlight
+from metrics import PDF_SECONDS, SEARCH_CALLS, SEARCH_SECONDS, record_job_usage, timed
+from tracing import span
 from datetime import datetime
 import json
 
@@ -12,6 +24,9 @@ from langchain.tools import BaseTool
 from typing import Type
 from pydantic import BaseModel, Field
 
+# Dossier des PDF de documentation, servis par la route /download-pdf
+PDF_FOLDER = 'pdfs'
+
 
 
 def clean_text_for_pdf(content):
@@ -40,6 +55,11 @@ class PDFGenerator:
 
     @staticmethod
     def create_documentation_pdf(content, project_name):
+        with span('pdf', project=project_name), timed(PDF_SECONDS, 'pdf'):
+            return PDFGenerator._create_documentation_pdf(content, project_name)
+
+    @staticmethod
+    def _create_documentation_pdf(content, project_name):
         try:
             content = clean_text_for_pdf(content)
             pdf = PDFGenerator.PDF()
@@ -131,7 +151,8 @@ class PDFGenerator:
                     if not in_code_block:
                         pdf.ln(5)
 
-            output_file = fr"\pdfs\{project_name}.pdf"
+            os.makedirs(PDF_FOLDER, exist_ok=True)
+            output_file = os.path.join(PDF_FOLDER, f"{project_name}.pdf")
             pdf.output(output_file, "F")
             print(f"PDF généré avec succès : {output_file}")
             return output_file
@@ -141,6 +162,171 @@ class PDFGenerator:
             traceback.print_exc()
             return None
 
+# Configuration de l'accès à Serper.dev
+SERPER_URL = os.getenv('SERPER_URL', 'https://google.serper.dev/search')
+SERPER_CONNECT_TIMEOUT = float(os.getenv('SERPER_CONNECT_TIMEOUT', '3.05'))
+SERPER_READ_TIMEOUT = float(os.getenv('SERPER_READ_TIMEOUT', '10'))
+SERPER_MAX_RETRIES = int(os.getenv('SERPER_MAX_RETRIES', '3'))
+SERPER_BACKOFF = float(os.getenv('SERPER_BACKOFF', '0.5'))
+SERPER_POOL_SIZE = int(os.getenv('SERPER_POOL_SIZE', '10'))
+
+# Statuts HTTP pour lesquels la requête est relancée
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Pays et langue des recherches
+SEARCH_GL = "us"
+SEARCH_HL = "en"
+
+# Cache persistant des résultats (désactivable avec SEARCH_CACHE=0)
+search_cache = SearchCache() if os.getenv('SEARCH_CACHE', '1') != '0' else None
+
+# Une seule requête Serper à la fois pour une même recherche, même entre pipelines concurrents
+search_flight = SingleFlight()
+
+_search_session = None
+_search_session_lock = threading.Lock()
+
+
+def get_search_session():
+    """
+    Session HTTP partagée vers Serper : connexions keep-alive réutilisées entre
+    les recherches et relances bornées avec backoff exponentiel + jitter.
+    """
+    global _search_session
+    if _search_session is None:
+        with _search_session_lock:
+            if _search_session is None:
+                retry = Retry(
+                    total=SERPER_MAX_RETRIES,
+                    backoff_factor=SERPER_BACKOFF,
+                    backoff_jitter=SERPER_BACKOFF,
+                    status_forcelist=RETRY_STATUSES,
+                    allowed_methods=frozenset(['POST']),
+                    respect_retry_after_header=True,
+                    raise_on_status=False
+                )
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=SERPER_POOL_SIZE, max_retries=retry)
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({
+                    'X-API-KEY': os.getenv('SERPER_API_KEY', ''),
+                    'Content-Type': 'application/json'
+                })
+                _search_session = session
+    return _search_session
+
+
+# Clients asynchrones, un par boucle d'événements (un client httpx est lié à sa boucle)
+_async_search_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_search_client():
+    """
+    Client httpx asynchrone partagé pour la boucle courante, avec pool keep-alive.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_search_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(SERPER_READ_TIMEOUT, connect=SERPER_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=SERPER_POOL_SIZE,
+                                max_keepalive_connections=SERPER_POOL_SIZE),
+            headers={
+                'X-API-KEY': os.getenv('SERPER_API_KEY', ''),
+                'Content-Type': 'application/json'
+            }
+        )
+        _async_search_clients[loop] = client
+    return client
+
+
+async def close_async_search_client():
+    client = _async_search_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def retry_delay(attempt, retry_after=None):
+    """
+    Délai avant la relance n° `attempt` : Retry-After si fourni, sinon backoff exponentiel + jitter.
+    """
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return SERPER_BACKOFF * (2 ** attempt) + random.uniform(0, SERPER_BACKOFF)
+
+
+# Début des réponses de WebSearchTool en échec (réseau, erreur HTTP après les relances)
+SEARCH_ERROR = "Erreur lors de la recherche"
+
+
+def is_search_error(output):
+    return output.startswith(SEARCH_ERROR)
+
+
+def search_payload(query, num_results):
+    return json.dumps({
+        "q": query,
+        "num": num_results,
+        "gl": SEARCH_GL,       # Pays = États-Unis
+        "hl": SEARCH_HL
+    })
+
+
+def search_key(query, num_results):
+    return SearchCache.make_key(query, num_results, SEARCH_GL, SEARCH_HL)
+
+
+def cached_search_results(query, num_results):
+    if search_cache is None:
+        return None
+    cached = search_cache.get(query, num_results, SEARCH_GL, SEARCH_HL)
+    if cached is not None:
+        SEARCH_CALLS.inc(source='cache')
+        record_job_usage(search_calls=1, search_cache_hits=1)
+    return cached
+
+
+def count_search(led):
+    """
+    Compte une recherche : 'network' si cet appel a fait la requête Serper, 'shared' s'il
+    a reçu la réponse d'une requête identique déjà en cours (search_flight).
+    """
+    SEARCH_CALLS.inc(source='network' if led else 'shared')
+    record_job_usage(search_calls=1)
+
+
+def store_search_results(query, num_results, results):
+    """
+    Met en forme la réponse et la garde en cache si elle contient des résultats.
+    """
+    formatted = format_search_results(results, num_results)
+    if search_cache is not None and "organic" in results:
+        search_cache.set(query, num_results, SEARCH_GL, SEARCH_HL, formatted)
+    return formatted
+
+
+def format_search_results(results, num_results):
+    """
+    Met en forme la réponse JSON de Serper pour l'agent.
+    """
+    if "organic" not in results:
+        return "Aucun résultat trouvé. Veuillez reformuler votre recherche."
+
+    formatted_results = []
+    for result in results["organic"][:num_results]:
+        formatted_results.append({
+            "title": result.get("title", ""),
+            "link": result.get("link", ""),
+            "snippet": result.get("snippet", "")
+        })
+
+    return json.dumps(formatted_results, indent=2, ensure_ascii=False)
+
+
 class WebSearchInput(BaseModel):
     query: str = Field(description="La requête de recherche")
     num_results: int = Field(default=3, description="Nombre de résultats à retourner")
@@ -151,44 +337,98 @@ class WebSearchTool(BaseTool):
     args_schema: Type[BaseModel] = WebSearchInput
 
     def _run(self, query: str, num_results: int = 3, run_manager=None) -> str:
+        with span('web_search', query=query, num_results=num_results):
+            return self._search(query, num_results)
+
+    def _search(self, query, num_results):
         try:
-            # Utiliser l'API Serper.dev
-            url = "https://google.serper.dev/search"
-            
-            payload = json.dumps({
-                "q": query,
-                "num": num_results,
-                "gl": "us",       # Pays = États-Unis
-                "hl": "en"   
-            })
-            
-            headers = {
-                'X-API-KEY': "",  # Obtenir la clé depuis les variables d'environnement
-                'Content-Type': 'application/json'
-            }
-            
-            response = requests.post(url, headers=headers, data=payload)
-            results = response.json()
-            
-            if "organic" not in results:
-                return "Aucun résultat trouvé. Veuillez reformuler votre recherche."
-            
-            formatted_results = []
-            for result in results["organic"][:num_results]:
-                formatted_results.append({
-                    "title": result.get("title", ""),
-                    "link": result.get("link", ""),
-                    "snippet": result.get("snippet", "")
-                })
-            
-            return json.dumps(formatted_results, indent=2, ensure_ascii=False)
+            cached = cached_search_results(query, num_results)
+            if cached is not None:
+                return cached
+
+            led = []
+
+            def search():
+                # Exécutée seulement par le premier appel d'une même recherche
+                led.append(True)
+                response = get_search_session().post(
+                    SERPER_URL,
+                    data=search_payload(query, num_results),
+                    timeout=(SERPER_CONNECT_TIMEOUT, SERPER_READ_TIMEOUT)
+                )
+                # Statut en erreur après les relances : un échec, pas une réponse sans résultat
+                response.raise_for_status()
+                return store_search_results(query, num_results, response.json())
+
+            try:
+                with timed(SEARCH_SECONDS, 'web_search'):
+                    return search_flight.do(search_key(query, num_results), search)
+            finally:
+                count_search(bool(led))
             
         except Exception as e:
-            return f"Erreur lors de la recherche: {str(e)}"
+            return f"{SEARCH_ERROR}: {str(e)}"
 
     async def _arun(self, query: str, num_results: int = 3, run_manager=None) -> str:
-        """Méthode asynchrone (non implémentée)"""
-        raise NotImplementedError("La recherche web ne supporte pas encore les appels asynchrones")
+        """Version asynchrone de la recherche (httpx), avec les mêmes relances que _run"""
+        with span('web_search', query=query, num_results=num_results, mode='async'):
+            return await self._asearch(query, num_results)
+
+    async def _asearch(self, query, num_results):
+        try:
+            cached = cached_search_results(query, num_results)
+            if cached is not None:
+                return cached
+
+            led = []
+
+            async def search():
+                # Exécutée seulement par le premier appel d'une même recherche
+                led.append(True)
+                client = get_async_search_client()
+                payload = search_payload(query, num_results)
+                for attempt in range(SERPER_MAX_RETRIES + 1):
+                    last_attempt = attempt == SERPER_MAX_RETRIES
+                    try:
+                        response = await client.post(SERPER_URL, content=payload)
+                    except httpx.TransportError:
+                        if last_attempt:
+                            raise
+                        await asyncio.sleep(retry_delay(attempt))
+                        continue
+                    if response.status_code in RETRY_STATUSES and not last_attempt:
+                        await asyncio.sleep(retry_delay(attempt, response.headers.get('Retry-After')))
+                        continue
+                    response.raise_for_status()
+                    return store_search_results(query, num_results, response.json())
+
+            try:
+                with timed(SEARCH_SECONDS, 'web_search'):
+                    return await search_flight.ado(search_key(query, num_results), search)
+            finally:
+                count_search(bool(led))
+
+        except Exception as e:
+            return f"{SEARCH_ERROR}: {str(e)}"
+
+    async def asearch_many(self, queries, num_results: int = 3):
+        """
+        Lance plusieurs recherches en parallèle.
+        Les résultats sont renvoyés dans l'ordre des requêtes.
+        """
+        return await asyncio.gather(*(self._arun(query, num_results) for query in queries))
+
+    def search_many(self, queries, num_results: int = 3):
+        """
+        Point d'entrée synchrone de asearch_many (depuis un code sans boucle asyncio).
+        """
+        async def run():
+            try:
+                return await self.asearch_many(queries, num_results)
+            finally:
+                await close_async_search_client()
+
+        return asyncio.run(run())
 
 # Création de l'outil
 
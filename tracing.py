@@ -0,0 +1,60 @@
+import os
+from contextlib import contextmanager
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+
+# Export des traces : "file" (une ligne JSON par span), "console" ou "none"
+TRACE_EXPORTER = os.getenv('TRACE_EXPORTER', 'file')
+TRACE_FILE = os.getenv('TRACE_FILE', os.path.join('traces', 'spans.jsonl'))
+SERVICE_NAME = 'crewai-code-generator'
+
+
+def setup_tracing(exporter=TRACE_EXPORTER, path=TRACE_FILE):
+    """
+    Installe le fournisseur de traces OpenTelemetry avec un exportateur local.
+    """
+    provider = TracerProvider(resource=Resource.create({'service.name': SERVICE_NAME}))
+    if exporter == 'console':
+        provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+    elif exporter == 'file':
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        out = open(path, 'a', encoding='utf-8')
+        provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter(
+            out=out,
+            formatter=lambda span: span.to_json(indent=None) + os.linesep
+        )))
+    trace.set_tracer_provider(provider)
+    return provider
+
+
+setup_tracing()
+tracer = trace.get_tracer('pipeline')
+
+
+def _attributes(attributes):
+    # OpenTelemetry n'accepte que des valeurs simples et non nulles
+    return {
+        name: value if isinstance(value, (str, bool, int, float)) else str(value)
+        for name, value in attributes.items() if value is not None
+    }
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Span enfant du span courant ; les exceptions y sont enregistrées.
+    """
+    with tracer.start_as_current_span(name, attributes=_attributes(attributes)) as current:
+        yield current
+
+
+def start_span(name, **attributes):
+    """
+    Span ouvert sans devenir courant, à fermer explicitement avec end() (callbacks).
+    """
+    return tracer.start_span(name, attributes=_attributes(attributes))
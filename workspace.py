@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import wait
+
+from jobs import current_job
+
+
+def default_workspace_root():
+    # En mémoire (tmpfs) quand c'est possible : écriture, compilation et exécution sans disque
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return os.path.join('/dev/shm', 'crewai-workspaces')
+    return os.path.join(tempfile.gettempdir(), 'crewai-workspaces')
+
+
+# Dossier de travail de chaque job (code généré, binaires compilés)
+WORKSPACE_ROOT = os.getenv('WORKSPACE_ROOT') or default_workspace_root()
+# Garder le dossier d'un job en erreur pour l'analyser, au plus WORKSPACE_RETENTION_SECONDS
+WORKSPACE_KEEP_FAILED = os.getenv('WORKSPACE_KEEP_FAILED', '1') == '1'
+WORKSPACE_RETENTION_SECONDS = int(os.getenv('WORKSPACE_RETENTION_SECONDS', '3600'))
+# Attente maximale des tâches qui utilisent encore le workspace quand le job se termine
+WORKSPACE_RELEASE_TIMEOUT = float(os.getenv('WORKSPACE_RELEASE_TIMEOUT', '120'))
+
+# Hors d'un job (crew.py en ligne de commande) : un dossier par processus
+LOCAL_WORKSPACE = f"local-{os.getpid()}"
+
+
+def job_workspace_dir(job_id=None):
+    if job_id is None:
+        job = current_job.get()
+        job_id = job.id if job is not None else LOCAL_WORKSPACE
+    return os.path.join(WORKSPACE_ROOT, job_id)
+
+
+def project_workspace(project_name, language):
+    """
+    Dossier vide réservé au projet `project_name` dans le workspace du job courant.
+    Les jobs concurrents n'écrivent jamais dans le même dossier.
+    """
+    project_dir = os.path.join(job_workspace_dir(), language, project_name)
+    # Repartir d'un dossier vide : aucun fichier d'une tentative précédente n'est compilé
+    shutil.rmtree(project_dir, ignore_errors=True)
+    os.makedirs(project_dir, exist_ok=True)
+    return project_dir
+
+
+# Tâches en arrière-plan qui écrivent encore dans un workspace (candidats perdants...), par dossier
+_holders = {}
+_holders_lock = threading.Lock()
+
+
+def hold_workspace(future, job_id=None):
+    """
+    Le workspace du job ne sera pas supprimé avant la fin de `future`.
+    """
+    path = job_workspace_dir(job_id)
+    with _holders_lock:
+        _holders.setdefault(path, []).append(future)
+
+
+def release_workspace(job_id=None, failed=False):
+    """
+    Supprime le workspace d'un job terminé (gardé jusqu'à expiration si le job a échoué),
+    après avoir attendu les tâches qui l'utilisent encore (voir hold_workspace).
+    """
+    path = job_workspace_dir(job_id)
+    with _holders_lock:
+        holders = _holders.pop(path, [])
+    if holders:
+        _, still_running = wait(holders, timeout=WORKSPACE_RELEASE_TIMEOUT)
+        if still_running:
+            print(f"{len(still_running)} tâche(s) encore en cours dans {path} après {WORKSPACE_RELEASE_TIMEOUT} s")
+    if failed and WORKSPACE_KEEP_FAILED:
+        print(f"Workspace conservé pour analyse : {path}")
+    else:
+        shutil.rmtree(path, ignore_errors=True)
+    purge_workspaces()
+
+
+def purge_workspaces(max_age=WORKSPACE_RETENTION_SECONDS):
+    """
+    Supprime les workspaces qui n'ont pas été modifiés depuis `max_age` secondes.
+    """
+    if not os.path.isdir(WORKSPACE_ROOT):
+        return
+    limit = time.time() - max_age
+    for name in os.listdir(WORKSPACE_ROOT):
+        path = os.path.join(WORKSPACE_ROOT, name)
+        try:
+            if os.path.isdir(path) and os.path.getmtime(path) < limit:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            continue